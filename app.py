@@ -1,19 +1,58 @@
 #app.py
+import threading
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 from flask import Flask
 from config import Config
 from extensions import init_extensions
+from instrumentation import init_instrumentation
 from routes import register_blueprints
-from routes.export import start_backup_scheduler 
+from scheduler import start_backup_scheduler
+from indexes import ensure_indexes
+from models import db
+from utils import display_date, display_money
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+
+def _ensure_indexes_in_background(app):
+    def run():
+        try:
+            for coll_name, messages in ensure_indexes(db).items():
+                for message in messages:
+                    app.logger.warning(f"Index on {coll_name} not created: {message}")
+        except Exception as e:
+            app.logger.warning(f"Index check skipped: {e}")
+
+    threading.Thread(target=run, name="ensure-indexes", daemon=True).start()
+
 
 def create_app():
+    # No database round-trips or prompts in here: seeding and indexes belong to
+    # `python init_db.py`, and anything optional runs off the boot path.
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # First, so request timing also covers the CSRF check
+    if app.config.get('METRICS_ENABLED'):
+        init_instrumentation(app)
     init_extensions(app)
     register_blueprints(app)
+    # Templates render stored dates/amounts (typed or legacy strings) through these
+    app.add_template_filter(display_date)
+    app.add_template_filter(display_money)
+
+    if app.config.get('ENSURE_INDEXES_ON_STARTUP'):
+        _ensure_indexes_in_background(app)
 
-    start_backup_scheduler() 
+    if app.config.get('BACKUP_SCHEDULER_ENABLED'):
+        start_backup_scheduler()
 
+    app.config['STARTUP_SECONDS'] = round(_IMPORT_SECONDS + time.perf_counter() - started, 4)
+    app.logger.info(f"App started in {app.config['STARTUP_SECONDS']}s (imports {_IMPORT_SECONDS:.3f}s)")
     return app
 
 if __name__ == '__main__':
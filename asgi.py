@@ -0,0 +1,291 @@
+#asgi.py
+"""
+ASGI entry point. The JSON endpoints the dynamic form calls are served here
+on an async Mongo client, so a waiting request costs a coroutine rather
+than a worker thread; every other path goes to the Flask app unchanged.
+
+    uvicorn asgi:app --workers 2
+"""
+import asyncio
+import hmac
+import json
+import os
+import re
+import time
+from http.cookies import SimpleCookie
+
+from asgiref.wsgi import WsgiToAsgi
+from itsdangerous import BadData, BadSignature, SignatureExpired, URLSafeTimedSerializer
+from pymongo.errors import DuplicateKeyError
+from werkzeug.security import check_password_hash, generate_password_hash
+from bson.objectid import ObjectId
+
+from app import create_app
+from config import Config
+from indexes import USERNAME_COLLATION
+from instrumentation import begin_request, end_request, record_request
+from models import client_options, asset_types_collection, users_collection
+from type_cache import type_cache, field_list_error
+from utils import get_master_fields, utc_now
+from warranty import parse_warranty_months
+
+flask_app = create_app()
+wsgi = WsgiToAsgi(flask_app)
+
+_client = None
+_client_pid = None
+
+
+# === Async Mongo access =====================================================
+class _ThreadedCollection:
+    """Async face over a sync collection, for mongomock:// or when no async driver is installed."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def find_one(self, *args, **kwargs):
+        return await asyncio.to_thread(self._collection.find_one, *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await asyncio.to_thread(self._collection.insert_one, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await asyncio.to_thread(self._collection.update_one, *args, **kwargs)
+
+    async def distinct(self, *args, **kwargs):
+        return await asyncio.to_thread(self._collection.distinct, *args, **kwargs)
+
+
+def _async_client_class():
+    try:
+        from pymongo import AsyncMongoClient  # pymongo >= 4.9
+        return AsyncMongoClient
+    except ImportError:
+        pass
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient
+    except ImportError:
+        return None
+
+
+def collection(name):
+    """Async collection `name` on this process's async client (same settings as models.get_client)."""
+    global _client, _client_pid
+    client_class = None if Config.MONGO_URI.startswith("mongomock://") else _async_client_class()
+    if client_class is None:
+        sync = {"asset_types": asset_types_collection, "users": users_collection}[name]
+        return _ThreadedCollection(sync)
+
+    if _client is None or _client_pid != os.getpid():
+        _client = client_class(Config.MONGO_URI, **client_options())
+        _client_pid = os.getpid()
+    return _client[Config.MONGO_DB_NAME][name]
+
+
+# === Session & CSRF (read the same cookie and token Flask issues) ===========
+def _load_session(scope):
+    cookies = SimpleCookie()
+    for key, value in scope.get("headers", []):
+        if key == b"cookie":
+            cookies.load(value.decode("latin-1"))
+    morsel = cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if not morsel:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return serializer.loads(morsel.value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def _csrf_error(scope, session):
+    """Mirror of flask_wtf.csrf.validate_csrf; returns the failure message or None."""
+    if not flask_app.config.get("WTF_CSRF_ENABLED", True):
+        return None
+    token = _header(scope, b"x-csrftoken") or _header(scope, b"x-csrf-token")
+    if not token:
+        return "The CSRF token is missing."
+    field_name = flask_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token")
+    if field_name not in session:
+        return "The CSRF session token is missing."
+
+    secret = flask_app.config.get("WTF_CSRF_SECRET_KEY") or flask_app.secret_key
+    serializer = URLSafeTimedSerializer(secret, salt="wtf-csrf-token")
+    try:
+        expected = serializer.loads(token, max_age=flask_app.config.get("WTF_CSRF_TIME_LIMIT", 3600))
+    except SignatureExpired:
+        return "The CSRF token has expired."
+    except BadData:
+        return "The CSRF token is invalid."
+    if not hmac.compare_digest(session[field_name], expected):
+        return "The CSRF tokens do not match."
+    return None
+
+
+# === Helpers ================================================================
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+async def _send_json(send, payload, status=200):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# === Endpoints ==============================================================
+async def get_asset_types(scope, receive, send):
+    names = type_cache.lookup_names()
+    if names is None:
+        names = type_cache.store_names(await collection("asset_types").distinct("type_name"))
+    await _send_json(send, names)
+
+
+async def get_fields(scope, receive, send, asset_type):
+    entry = type_cache.lookup(asset_type)
+    if entry is None:
+        doc = await collection("asset_types").find_one({"type_name": asset_type})
+        entry = type_cache.store(doc) if doc else None
+    # ✅ Always return fields key to avoid frontend error
+    await _send_json(send, {"fields": entry["fields"] if entry else []})
+
+
+async def get_master_fields_api(scope, receive, send):
+    await _send_json(send, {"fields": get_master_fields()})
+
+
+async def create_type(scope, receive, send):
+    error = _csrf_error(scope, _load_session(scope))
+    if error:
+        return await _send_json(send, {"error": f"CSRF Error: {error}"}, 400)
+
+    data = await _read_json(receive) or {}
+    type_name = data.get("type")
+    fields = data.get("fields", [])
+    if not type_name:
+        return await _send_json(send, {"success": False, "message": "Type name and fields are required."}, 400)
+    error = field_list_error(fields)
+    if error:
+        return await _send_json(send, {"success": False, "message": error}, 400)
+    try:
+        warranty_months = parse_warranty_months(data.get("warranty_months"))
+    except ValueError as e:
+        return await _send_json(send, {"success": False, "message": str(e)}, 400)
+
+    types = collection("asset_types")
+    if await types.find_one({"type_name": type_name}, {"_id": 1}):
+        return await _send_json(send, {"success": False, "message": "Type already exists."}, 409)
+    try:
+        await types.insert_one({
+            "type_name": type_name, "fields": fields, "warranty_months": warranty_months, "updated_at": utc_now(),
+        })
+    except DuplicateKeyError:
+        return await _send_json(send, {"success": False, "message": "Type already exists."}, 409)
+    type_cache.invalidate(type_name)
+    await _send_json(send, {"success": True, "message": "Type created successfully."})
+
+
+async def change_password(scope, receive, send):
+    session = _load_session(scope)
+    if "username" not in session:
+        return await _send_json(send, {"error": "Unauthorized"}, 401)
+    error = _csrf_error(scope, session)
+    if error:
+        return await _send_json(send, {"error": f"CSRF Error: {error}"}, 400)
+
+    data = await _read_json(receive)
+    if not data:
+        return await _send_json(send, {"error": "Missing JSON body"}, 400)
+
+    current_pw = data.get("current_password", "").strip()
+    new_pw = data.get("new_password", "").strip()
+    confirm_pw = data.get("confirm_password", "").strip()
+    if not current_pw or not new_pw or not confirm_pw:
+        return await _send_json(send, {"error": "All fields are required."}, 400)
+
+    users = collection("users")
+    if session.get("user_id"):
+        user = await users.find_one({"_id": ObjectId(session["user_id"])})
+    else:
+        user = await users.find_one({"username": session["username"]}, collation=USERNAME_COLLATION)
+
+    # Password hashing is deliberately slow; keep it off the event loop
+    if not user or not await asyncio.to_thread(check_password_hash, user["password"], current_pw):
+        return await _send_json(send, {"error": "Current password is incorrect."}, 400)
+    if new_pw != confirm_pw:
+        return await _send_json(send, {"error": "New passwords do not match."}, 400)
+
+    hashed = await asyncio.to_thread(generate_password_hash, new_pw)
+    await users.update_one({"_id": user["_id"]}, {"$set": {"password": hashed, "updated_at": utc_now()}})
+    await _send_json(send, {"message": "Password updated successfully."})
+
+
+async def _instrumented(handler, scope, receive, send, params):
+    """Same request metrics and slow-request log as the Flask routes (endpoint "asgi.<handler>")."""
+    status = 500
+
+    async def send_and_capture(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        await send(message)
+
+    token = begin_request()
+    started = time.perf_counter()
+    try:
+        await handler(scope, receive, send_and_capture, **params)
+    finally:
+        seconds = time.perf_counter() - started
+        record_request(scope["method"], scope["path"], f"asgi.{handler.__name__}", status, seconds, end_request(token))
+
+
+# (method, path pattern, handler); anything unmatched falls through to Flask
+ROUTES = [
+    ("GET", re.compile(r"^/get_asset_types$"), get_asset_types),
+    ("GET", re.compile(r"^/get_fields/(?P<asset_type>[^/]+)$"), get_fields),
+    ("GET", re.compile(r"^/get_master_fields$"), get_master_fields_api),
+    ("POST", re.compile(r"^/create_type$"), create_type),
+    ("POST", re.compile(r"^/auth/api/change_password$"), change_password),
+]
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http":
+        for method, pattern, handler in ROUTES:
+            match = pattern.match(scope["path"])
+            if match and scope["method"] == method:
+                if Config.METRICS_ENABLED:
+                    return await _instrumented(handler, scope, receive, send, match.groupdict())
+                return await handler(scope, receive, send, **match.groupdict())
+
+    await wsgi(scope, receive, send)
@@ -0,0 +1,389 @@
+#backup.py
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+
+import bson
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.json_util import JSONOptions, JSONMode
+from bson.raw_bson import RawBSONDocument
+
+from pymongo import ReplaceOne
+
+from config import Config
+from indexes import ensure_indexes, REQUIRED_INDEXES
+
+MANIFEST_NAME = "manifest.json"
+FORMATS = ("bson", "jsonl")
+COMPRESSIONS = ("gzip", "zstd", "none")
+
+# Collections whose writes stamp updated_at, and so can be backed up incrementally
+TRACKED_COLLECTIONS = ["assets", "asset_types", "users"]
+
+# Locks, job and status records, and derived data: never backed up or restored,
+# so a restore can't bring back a stale lease or overwrite the running one
+OPERATIONAL_COLLECTIONS = {"locks", "backup_status", "export_jobs", "asset_summary"}
+
+# Canonical extended JSON round-trips every BSON type (dates, ObjectIds, decimals)
+_JSONL_OPTIONS = JSONOptions(json_mode=JSONMode.CANONICAL)
+
+# Dumps copy the server's raw bytes straight to disk without decoding
+_RAW = CodecOptions(document_class=RawBSONDocument)
+
+# Restores load into `<prefix><collection>` first and swap it in when complete
+STAGING_PREFIX = "restore_staging_"
+
+
+def _extension(fmt, compression):
+    suffix = {"gzip": ".gz", "zstd": ".zst", "none": ""}[compression]
+    return f".{fmt}{suffix}"
+
+
+def _open(path, mode, compression):
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=Config.BACKUP_GZIP_LEVEL)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstandard is not installed; run `pip install zstandard` or use gzip compression.")
+        raw = open(path, mode)
+        if "w" in mode:
+            return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(path, mode)
+
+
+def _dump_collection(collection, path, fmt, compression, query=None):
+    count = 0
+    try:
+        source = collection.with_options(codec_options=_RAW)
+    except NotImplementedError:
+        source = collection  # mongomock has no raw document support
+
+    with _open(path, "wb", compression) as out:
+        for doc in source.find(query or {}).batch_size(Config.BACKUP_BATCH_SIZE):
+            if fmt == "bson":
+                out.write(doc.raw if isinstance(doc, RawBSONDocument) else bson.encode(doc))
+            else:
+                if isinstance(doc, RawBSONDocument):
+                    doc = bson.decode(doc.raw)
+                out.write(json_util.dumps(doc, json_options=_JSONL_OPTIONS).encode("utf-8") + b"\n")
+            count += 1
+    return count
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _iter_documents(path, fmt, compression):
+    with _open(path, "rb", compression) as src:
+        if fmt == "bson":
+            yield from bson.decode_file_iter(src)
+        else:
+            # zstd readers don't support line iteration on their own
+            lines = io.BufferedReader(src) if compression == "zstd" else src
+            for line in lines:
+                if line.strip():
+                    yield json_util.loads(line, json_options=_JSONL_OPTIONS)
+
+
+def create_backup(db, backup_dir=None, fmt=None, compression=None, collections=None, parent=None):
+    """
+    Stream every collection of `db` into <backup_dir>/<db>_<timestamp>/ with a
+    manifest. The folder only appears under its final name once complete.
+
+    With `parent` (a manifest), only documents of TRACKED_COLLECTIONS whose
+    updated_at is at or after the parent's checkpoint are written, making an
+    incremental backup chained to that parent.
+
+    Returns the manifest (with its "path").
+    """
+    backup_dir = backup_dir or Config.BACKUP_DIR
+    fmt = fmt or Config.BACKUP_FORMAT
+    compression = compression or Config.BACKUP_COMPRESSION
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown backup format: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown backup compression: {compression}")
+
+    created_at = datetime.now()
+    # Checkpoint taken before reading anything; the next increment starts here
+    checkpoint = datetime.now(timezone.utc)
+    name = f"{db.name}_{created_at.strftime('%Y%m%d_%H%M%S')}"
+    final_path = os.path.join(backup_dir, name)
+    if os.path.exists(final_path):
+        name = f"{name}_{created_at.strftime('%f')}"
+        final_path = os.path.join(backup_dir, name)
+    work_path = final_path + ".partial"
+    os.makedirs(work_path, exist_ok=True)
+
+    manifest = {
+        "name": name,
+        "database": db.name,
+        "created_at": created_at.isoformat(),
+        "format": fmt,
+        "compression": compression,
+        "kind": "incremental" if parent else "full",
+        "base": parent.get("base", parent["name"]) if parent else name,
+        "parent": parent["name"] if parent else None,
+        "since": parent["checkpoint"] if parent else None,
+        "checkpoint": checkpoint.isoformat(),
+        "collections": {},
+    }
+    query = {"updated_at": {"$gte": datetime.fromisoformat(parent["checkpoint"])}} if parent else None
+
+    try:
+        if parent:
+            names = collections or TRACKED_COLLECTIONS
+        else:
+            names = collections or sorted(
+                n for n in db.list_collection_names()
+                if not n.startswith(("system.", STAGING_PREFIX)) and n not in OPERATIONAL_COLLECTIONS
+            )
+        for coll_name in names:
+            filename = coll_name + _extension(fmt, compression)
+            file_path = os.path.join(work_path, filename)
+            count = _dump_collection(db[coll_name], file_path, fmt, compression, query)
+            manifest["collections"][coll_name] = {
+                "file": filename,
+                "documents": count,
+                "bytes": os.path.getsize(file_path),
+                "sha256": file_sha256(file_path),
+            }
+
+        manifest["finished_at"] = datetime.now().isoformat()
+        manifest["bytes"] = sum(c["bytes"] for c in manifest["collections"].values())
+        with open(os.path.join(work_path, MANIFEST_NAME), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(work_path, final_path)
+    except Exception:
+        shutil.rmtree(work_path, ignore_errors=True)
+        raise
+
+    manifest["path"] = final_path
+    return manifest
+
+
+def create_incremental_backup(db, backup_dir=None, fmt=None, compression=None):
+    """Increment on top of the newest backup, or a full backup if there is none yet."""
+    backups = list_backups(backup_dir)
+    # Backups written before checkpoints were recorded can't anchor an increment
+    parent = backups[0] if backups and backups[0].get("checkpoint") else None
+    return create_backup(db, backup_dir, fmt, compression, parent=parent)
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME)) as fh:
+        manifest = json.load(fh)
+    manifest["path"] = path
+    return manifest
+
+
+def list_backups(backup_dir=None):
+    """Manifests of completed backups, newest first."""
+    backup_dir = backup_dir or Config.BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    manifests = []
+    for entry in os.listdir(backup_dir):
+        path = os.path.join(backup_dir, entry)
+        if os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+            manifests.append(read_manifest(path))
+    return sorted(manifests, key=lambda m: m["created_at"], reverse=True)
+
+
+def backup_chain(path):
+    """Manifests from the full base up to the backup at `path`, oldest first."""
+    manifest = read_manifest(path)
+    chain = [manifest]
+    while manifest.get("parent"):
+        manifest = read_manifest(os.path.join(os.path.dirname(path), manifest["parent"]))
+        chain.append(manifest)
+    return list(reversed(chain))
+
+
+def find_backup(name, backup_dir=None):
+    """Manifest of the completed backup called `name`, or None."""
+    backup_dir = backup_dir or Config.BACKUP_DIR
+    if not name or os.path.basename(name) != name:
+        return None
+    path = os.path.join(backup_dir, name)
+    return read_manifest(path) if os.path.isfile(os.path.join(path, MANIFEST_NAME)) else None
+
+
+def verify_backup(path, deep=False):
+    """
+    Check every file of the backup at `path` against its manifest: present,
+    same size and same sha256. With `deep`, also decode each file and compare
+    document counts. Returns a list of problems (empty when the backup is sound).
+    Backups written before checksums were recorded are only size-checked.
+    """
+    manifest = read_manifest(path)
+    problems = []
+    for coll_name, info in manifest["collections"].items():
+        file_path = os.path.join(path, info["file"])
+        if not os.path.isfile(file_path):
+            problems.append(f"{coll_name}: {info['file']} is missing")
+            continue
+        if os.path.getsize(file_path) != info["bytes"]:
+            problems.append(f"{coll_name}: size {os.path.getsize(file_path)} != {info['bytes']}")
+            continue
+        if info.get("sha256") and file_sha256(file_path) != info["sha256"]:
+            problems.append(f"{coll_name}: checksum mismatch")
+            continue
+        if deep:
+            try:
+                count = sum(1 for _ in _iter_documents(file_path, manifest["format"], manifest["compression"]))
+            except Exception as e:
+                problems.append(f"{coll_name}: unreadable ({e})")
+                continue
+            if count != info["documents"]:
+                problems.append(f"{coll_name}: {count} documents != {info['documents']}")
+    return problems
+
+
+def verify_chain(path, deep=False):
+    """verify_backup() over the backup at `path` and every backup it builds on."""
+    problems = []
+    try:
+        chain = backup_chain(path)
+    except FileNotFoundError as e:
+        return [f"broken chain: {e.filename} is missing"]
+    for manifest in chain:
+        problems.extend(f"{manifest['name']}: {p}" for p in verify_backup(manifest["path"], deep))
+    return problems
+
+
+def prune_backups(backup_dir=None, keep_chains=None, max_age_days=None):
+    """
+    Retention policy. Backups are removed a whole chain (full base plus its
+    increments) at a time so no kept increment loses its parent. The newest
+    `keep_chains` chains are always kept; older ones are removed, as is any
+    chain whose newest backup is older than `max_age_days` (0 = no limit).
+    Returns the names of the removed backup folders.
+    """
+    backup_dir = backup_dir or Config.BACKUP_DIR
+    keep_chains = Config.BACKUP_KEEP_CHAINS if keep_chains is None else keep_chains
+    max_age_days = Config.BACKUP_MAX_AGE_DAYS if max_age_days is None else max_age_days
+
+    chains = {}
+    for manifest in list_backups(backup_dir):  # newest first
+        chains.setdefault(manifest.get("base", manifest["name"]), []).append(manifest)
+    # Newest chain first, ordered by its latest backup
+    ordered = sorted(chains.values(), key=lambda c: c[0]["created_at"], reverse=True)
+
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat() if max_age_days else None
+    removed = []
+    for position, chain in enumerate(ordered):
+        if position == 0:
+            continue  # never leave the deployment without a restorable backup
+        if position >= keep_chains or (cutoff and chain[0]["created_at"] < cutoff):
+            for manifest in chain:
+                shutil.rmtree(manifest["path"], ignore_errors=True)
+                removed.append(manifest["name"])
+
+    # Folders left behind by a backup process that died mid-write
+    for entry in os.listdir(backup_dir) if os.path.isdir(backup_dir) else []:
+        path = os.path.join(backup_dir, entry)
+        if entry.endswith(".partial") and os.path.getmtime(path) < time.time() - 86400:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(entry)
+    return removed
+
+
+def _load_documents(collection, documents, batch_size, upsert):
+    """Write documents in batches: plain inserts for a base, upserts by _id for increments."""
+    count = 0
+    batch = []
+    for doc in documents:
+        batch.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) if upsert else doc)
+        if len(batch) >= batch_size:
+            count += _write_batch(collection, batch, upsert)
+            batch = []
+    if batch:
+        count += _write_batch(collection, batch, upsert)
+    return count
+
+
+def _write_batch(collection, batch, upsert):
+    if upsert:
+        collection.bulk_write(batch, ordered=False)
+    else:
+        collection.insert_many(batch, ordered=False)
+    return len(batch)
+
+
+def _chain_collections(chain, collections):
+    """Collections held by the chain's base, narrowed to `collections` when given."""
+    names = [n for n in chain[0]["collections"] if n not in OPERATIONAL_COLLECTIONS]
+    if collections:
+        unknown = set(collections) - set(names)
+        if unknown:
+            raise ValueError(f"Not in this backup: {', '.join(sorted(unknown))}")
+        names = [n for n in names if n in collections]
+    return names
+
+
+def restore_backup(db, path, collections=None, batch_size=None, staging=True, verify=True):
+    """
+    Restore the backup at `path` (its full base plus each increment up to it)
+    into `db`, optionally only some `collections`. Returns {collection: documents}.
+
+    The chain is checksum-verified first. With `staging`, each collection is
+    loaded and indexed as STAGING_PREFIX + name while the live one keeps
+    serving, then all are swapped in with renameCollection(dropTarget=True);
+    the app only sees the swap itself. Without it, live collections are
+    dropped and reloaded in place.
+    """
+    if verify:
+        problems = verify_chain(path)
+        if problems:
+            raise RuntimeError("Backup failed verification: " + "; ".join(problems))
+
+    chain = backup_chain(path)
+    names = _chain_collections(chain, collections)
+    batch_size = batch_size or Config.BACKUP_BATCH_SIZE
+
+    restored = {}
+    targets = {}
+    try:
+        for coll_name in names:
+            target = db[STAGING_PREFIX + coll_name] if staging else db[coll_name]
+            target.drop()
+            if staging:
+                db.create_collection(target.name)  # an empty backup still swaps in as empty
+            targets[coll_name] = target
+            for position, manifest in enumerate(chain):
+                info = manifest["collections"].get(coll_name)
+                if not info:
+                    continue
+                documents = _iter_documents(os.path.join(manifest["path"], info["file"]), manifest["format"], manifest["compression"])
+                restored[coll_name] = restored.get(coll_name, 0) + _load_documents(target, documents, batch_size, upsert=position > 0)
+            restored.setdefault(coll_name, 0)
+            # Build indexes before the swap so the live collection never runs without them
+            if coll_name in REQUIRED_INDEXES:
+                target.create_indexes(REQUIRED_INDEXES[coll_name])
+    except Exception:
+        if staging:
+            for target in targets.values():
+                target.drop()
+        raise
+
+    if staging:
+        for coll_name, target in targets.items():
+            target.rename(coll_name, dropTarget=True)
+
+    ensure_indexes(db)
+    return restored
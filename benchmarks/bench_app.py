@@ -0,0 +1,279 @@
+#bench_app.py
+"""
+End-to-end timings on a seeded database: dashboard renders, /get_fields,
+create/edit throughput, login, and the Excel/KEKA exports (time and peak
+memory). Writes a JSON report and, given a previous one as --baseline,
+lists every metric that got slower than --tolerance and exits 1.
+
+    MONGO_URI=mongomock:// python benchmarks/bench_app.py --assets 5000
+    python benchmarks/bench_app.py --assets 100000 --output bench.json
+    python benchmarks/bench_app.py --assets 100000 --baseline bench.json
+
+Everything runs against a dedicated database (--db, default "ams_bench")
+that is dropped afterwards unless --keep is given.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench-password"
+# Marks a database as one this script created, so it never seeds or drops a real one
+MARKER_COLLECTION = "bench_meta"
+
+# Lower is better for all of these; anything else in the report is informational
+COMPARED_METRICS = ("p50_ms", "p95_ms", "seconds", "peak_mb")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=10_000, help="synthetic assets to seed")
+    parser.add_argument("--repeat", type=int, default=20, help="requests per read measurement")
+    parser.add_argument("--writes", type=int, default=200, help="creates and edits to time")
+    parser.add_argument("--db", default="ams_bench", help="database to seed (must be new or an earlier bench db)")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database for another run")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the tracemalloc export passes")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+# === Measuring ==============================================================
+def latency(fn, repeat):
+    """{p50_ms, p95_ms, mean_ms} over `repeat` calls of fn(i)."""
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "count": repeat,
+    }
+
+
+def throughput(fn, count):
+    result = latency(fn, count)
+    result["ops_per_sec"] = round(1000 / result["mean_ms"], 1) if result["mean_ms"] else None
+    return result
+
+
+def expect(response, *statuses):
+    if response.status_code not in statuses:
+        raise RuntimeError(f"{response.request.method} {response.request.path} returned {response.status_code}")
+    return response
+
+
+# === Seeding ================================================================
+def seed(db, count):
+    from werkzeug.security import generate_password_hash
+    from indexes import ensure_indexes
+    from init_db import seed_asset_types
+    from models import assets_collection, users_collection
+    from search import build_search_terms
+    from synthetic import synthetic_assets
+    from utils import utc_now
+
+    collections = set(db.list_collection_names())
+    if collections and MARKER_COLLECTION not in collections:
+        raise SystemExit(f"❌ Database '{db.name}' already holds data that isn't from a benchmark; pick another --db.")
+    # bench_writes adds and edits assets, so a --keep database is only reused untouched
+    if (MARKER_COLLECTION in collections and db[MARKER_COLLECTION].find_one({"assets": count})
+            and assets_collection.count_documents({}) == count):
+        print(f"ℹ️ Reusing the {count:,} assets seeded in '{db.name}'.")
+        return 0.0
+
+    started = time.perf_counter()
+    for name in collections:
+        db.drop_collection(name)
+    db[MARKER_COLLECTION].insert_one({"created_at": utc_now()})
+    seed_asset_types()
+    ensure_indexes(db)
+
+    batch = []
+    now = utc_now()
+    for doc in synthetic_assets(count):
+        doc["search_terms"] = build_search_terms(doc)
+        doc["updated_at"] = now
+        batch.append(doc)
+        if len(batch) >= 1000:
+            assets_collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        assets_collection.insert_many(batch, ordered=False)
+
+    users_collection.insert_one({
+        "username": BENCH_USER, "password": generate_password_hash(BENCH_PASSWORD), "updated_at": now,
+    })
+    db[MARKER_COLLECTION].update_one({}, {"$set": {"assets": count}})
+    return time.perf_counter() - started
+
+
+# === Scenarios ==============================================================
+def bench_reads(app, client, repeat):
+    from init_db import asset_type_fields
+
+    results = {}
+    dashboards = {
+        "dashboard": "/dashboard",
+        "dashboard_sorted": "/dashboard?sort=given_date&order=desc",
+        "dashboard_filtered": "/dashboard?status=assigned&state=Kerala",
+        "dashboard_search": "/dashboard?search=model-1",
+        "dashboard_date_range": "/dashboard?date_field=purchase_date&date_from=2021-01-01&date_to=2021-03-31",
+    }
+    for name, url in dashboards.items():
+        results[name] = latency(lambda i, url=url: expect(client.get(url), 200), repeat)
+
+    types = list(asset_type_fields)
+    results["get_fields"] = latency(lambda i: expect(client.get(f"/get_fields/{types[i % len(types)]}"), 200), repeat)
+    return results
+
+
+def bench_login(app, repeat):
+    # Fresh client per attempt so every request is a real password check
+    def login(i):
+        client = app.test_client()
+        expect(client.post("/auth/login", data={"identifier": BENCH_USER, "passcode": BENCH_PASSWORD}), 302)
+
+    return {"login": latency(login, repeat)}
+
+
+def bench_writes(client, writes, seed_value=11):
+    from init_db import asset_type_fields
+    from models import assets_collection
+    from synthetic import synthetic_asset
+    from utils import form_values
+
+    rng = random.Random(seed_value)
+    types = list(asset_type_fields)
+    forms = [form_values(synthetic_asset(rng, types[i % len(types)], writes)) for i in range(writes)]
+    results = {"create_asset": throughput(lambda i: expect(client.post("/create_asset", data=forms[i]), 302), writes)}
+
+    ids = [str(doc["_id"]) for doc in assets_collection.find({}, {"_id": 1}).limit(writes)]
+    results["edit_asset"] = throughput(
+        lambda i: expect(client.post(f"/edit_asset/{ids[i % len(ids)]}", data=forms[i]), 302), writes,
+    )
+    return results
+
+
+def bench_exports(skip_memory):
+    from exporters import iter_assets, write_excel_workbook, write_keka_workbook
+    from models import assets_collection
+
+    results = {}
+    for name, writer in (("export_keka", write_keka_workbook), ("export_excel", write_excel_workbook)):
+        with tempfile.TemporaryFile() as fh:
+            started = time.perf_counter()
+            rows = writer(fh, iter_assets(assets_collection))
+            seconds = time.perf_counter() - started
+        results[name] = {"seconds": round(seconds, 3), "rows": rows, "rows_per_sec": round(rows / seconds, 1)}
+
+        if not skip_memory:
+            # Separate pass: tracing slows the export, so it must not skew the timing above
+            tracemalloc.start()
+            with tempfile.TemporaryFile() as fh:
+                writer(fh, iter_assets(assets_collection))
+            results[name]["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.stop()
+    return results
+
+
+# === Report =================================================================
+def compare(results, baseline, tolerance):
+    """[(scenario, metric, old, new, change)] for every metric slower than `tolerance`."""
+    regressions = []
+    for scenario, metrics in results.items():
+        old_metrics = baseline.get("results", {}).get(scenario, {})
+        for metric in COMPARED_METRICS:
+            old, new = old_metrics.get(metric), metrics.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append((scenario, metric, old, new, new / old - 1))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'scenario':<24} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10} {'seconds':>10} {'peak MB':>10}")
+    for scenario, m in results.items():
+        cells = [m.get("p50_ms"), m.get("p95_ms"), m.get("ops_per_sec") or m.get("rows_per_sec"), m.get("seconds"), m.get("peak_mb")]
+        print(f"{scenario:<24} " + " ".join(f"{'—' if v is None else v:>10}" for v in cells))
+
+
+def main():
+    args = parse_args()
+    # Before the app modules are imported: they read Config at import time
+    os.environ["MONGO_DB_NAME"] = args.db
+    os.environ["BACKUP_SCHEDULER_ENABLED"] = "0"
+
+    from app import create_app
+    from config import Config
+    from models import get_client, get_db
+
+    db = get_db()
+    print(f"Seeding {args.assets:,} assets into '{args.db}' ({Config.MONGO_URI.split('@')[-1]})...")
+    seed_seconds = seed(db, args.assets)
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    client = app.test_client()
+    expect(client.post("/auth/login", data={"identifier": BENCH_USER, "passcode": BENCH_PASSWORD}), 302)
+
+    results = {}
+    try:
+        results.update(bench_reads(app, client, args.repeat))
+        results.update(bench_login(app, min(args.repeat, 10)))
+        results.update(bench_exports(args.skip_memory))
+        # Last, so the reads and exports above all see exactly --assets documents
+        db[MARKER_COLLECTION].update_one({}, {"$unset": {"assets": ""}})
+        results.update(bench_writes(client, args.writes))
+    finally:
+        if not args.keep:
+            get_client().drop_database(args.db)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "assets": args.assets,
+            "repeat": args.repeat,
+            "writes": args.writes,
+            "seed_seconds": round(seed_seconds, 2),
+            "mongo": "mongomock" if Config.MONGO_URI.startswith("mongomock://") else "mongodb",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get("meta", {}).get("assets") != args.assets:
+            print(f"⚠️ Baseline was run with {baseline['meta'].get('assets')} assets; numbers may not be comparable.")
+        regressions = compare(results, baseline, args.tolerance)
+        for scenario, metric, old, new, change in regressions:
+            print(f"❌ {scenario}.{metric}: {old} -> {new} (+{change:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
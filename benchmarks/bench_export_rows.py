@@ -0,0 +1,118 @@
+#bench_export_rows.py
+"""
+Rows/second of the batched export row builders against the per-row
+builders they replaced, on synthetic assets (no database).
+
+    python benchmarks/bench_export_rows.py                 # 100k assets, row building only
+    python benchmarks/bench_export_rows.py --workbook      # also write the full .xlsx files
+    python benchmarks/bench_export_rows.py --assets 20000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporters import (
+    DATE_TYPES, EXCEL_CURRENCY_FORMAT, EXCEL_DATE_FORMAT, EXCEL_NUMBER_FORMAT, KEKA_ID_FIELDS, KEKA_ROW_BUILDER,
+    NUMBER_TYPES, excel_layout, iter_batches, to_date, to_number, write_excel_workbook, write_keka_workbook,
+)
+from init_db import asset_type_fields
+from synthetic import synthetic_assets
+
+
+# === Baseline: the per-row builders the batched ones replaced ===============
+def _keka_date(d):
+    d = to_date(d)
+    return d.strftime("%d-%b-%Y") if d else ""
+
+
+def keka_row(asset):
+    asset_id = next((asset.get(f, "").strip() for f in KEKA_ID_FIELDS if asset.get(f)), "")
+    asset_type = asset.get("category", "").strip()
+    desc_parts = [asset.get(f, "").strip() for f in ("model", "system_model", "ram", "storage")]
+    asset_desc = "  ".join([d for d in desc_parts if d])
+    area = asset.get("area", "").strip()
+    state = asset.get("state", "").strip()
+    location = f"{area} ({state})" if state else area
+    given_date = _keka_date(asset.get("given_date"))
+    status = asset.get("status", "").strip()
+    username = asset.get("username", "").strip()
+    user_code = asset.get("user_code", "").strip()
+    employee_number = f"{username} ({user_code})" if user_code else username
+
+    return [
+        asset_id, asset_type, asset_desc, location, "IT assets", asset_type, given_date,
+        _keka_date(asset.get("warranty_expiry")), status, status, status, employee_number, given_date,
+    ]
+
+
+def _excel_value(raw_value, dtype):
+    if raw_value is None:
+        return "", None
+    if dtype in DATE_TYPES:
+        value = to_date(raw_value)
+        return (value, EXCEL_DATE_FORMAT) if value else (str(raw_value), None)
+    if dtype in NUMBER_TYPES:
+        value = to_number(raw_value)
+        if value is None:
+            return str(raw_value), None
+        return value, EXCEL_CURRENCY_FORMAT if dtype == "currency" else EXCEL_NUMBER_FORMAT
+    return str(raw_value), None
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    print(f"{label:<32} {seconds:8.3f}s  {count / seconds:>12,.0f} rows/s")
+
+
+def per_row_keka(assets):
+    for asset in assets:
+        keka_row(asset)
+
+
+def per_row_excel(assets):
+    columns = {name: [(f["name"], f.get("type", "text")) for f in fields] for name, fields in asset_type_fields.items()}
+    for asset in assets:
+        [_excel_value(asset.get(key, ""), dtype) for key, dtype in columns[asset["category"]]]
+
+
+def batched_keka(assets):
+    for batch in iter_batches(assets):
+        KEKA_ROW_BUILDER.rows(batch)
+
+
+def batched_excel(assets):
+    layouts = {name: excel_layout(fields)[0] for name, fields in asset_type_fields.items()}
+    for batch in iter_batches(assets):
+        by_type = {}
+        for asset in batch:
+            by_type.setdefault(asset["category"], []).append(asset)
+        for category, group in by_type.items():
+            layouts[category].rows(group)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=100_000)
+    parser.add_argument("--workbook", action="store_true", help="also time the full openpyxl workbook writes")
+    args = parser.parse_args()
+
+    assets = synthetic_assets(args.assets)
+    print(f"{args.assets:,} synthetic assets across {len(asset_type_fields)} types\n")
+
+    timed("KEKA rows, one at a time", args.assets, lambda: per_row_keka(assets))
+    timed("KEKA rows, batched", args.assets, lambda: batched_keka(assets))
+    timed("Excel rows, one at a time", args.assets, lambda: per_row_excel(assets))
+    timed("Excel rows, batched", args.assets, lambda: batched_excel(assets))
+    if args.workbook:
+        timed("KEKA workbook (.xlsx)", args.assets, lambda: write_keka_workbook(io.BytesIO(), assets))
+        timed("Excel workbook (.xlsx)", args.assets, lambda: write_excel_workbook(io.BytesIO(), assets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#synthetic.py
+import random
+from datetime import datetime, timedelta
+
+from init_db import asset_type_fields
+from type_cache import STORED_STATUSES
+from utils import DATE_FIELDS, MONEY_FIELDS, get_indian_states
+
+
+def synthetic_asset(rng, category, count):
+    """One typed document with every field of `category` filled in."""
+    doc = {"category": category}
+    for field in asset_type_fields[category]:
+        name = field["name"]
+        if name in DATE_FIELDS:
+            doc[name] = datetime(2019, 1, 1) + timedelta(days=rng.randrange(2500))
+        elif name in MONEY_FIELDS:
+            doc[name] = round(rng.uniform(500, 150000), 2)
+        elif name == "status":
+            doc[name] = rng.choice(STORED_STATUSES)
+        elif name == "state":
+            doc[name] = rng.choice(get_indian_states())
+        else:
+            doc[name] = f"{name}-{rng.randrange(count)}"
+    return doc
+
+
+def synthetic_assets(count, seed=7):
+    """`count` documents spread evenly over every type in init_db.asset_type_fields (same seed, same data)."""
+    rng = random.Random(seed)
+    types = list(asset_type_fields)
+    return [synthetic_asset(rng, types[i % len(types)], count) for i in range(count)]
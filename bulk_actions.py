@@ -0,0 +1,65 @@
+#bulk_actions.py
+from pymongo import UpdateOne, UpdateMany
+
+from models import assets_collection
+from search import build_search_terms, SEARCH_FIELDS
+from summary import mark_summary_stale
+from type_cache import type_cache
+from utils import build_partial_payload, utc_now
+
+# Status & assignment fields offered by the dashboard's bulk edit
+BULK_FIELDS = ["status", "username", "user_code", "given_date", "area", "state", "remarks"]
+
+
+def bulk_update_assets(ids, changes, collection=assets_collection):
+    """
+    Apply the same partial `changes` to every asset in `ids` with one read
+    and one unordered bulk_write. Changes are normalized and validated once
+    per asset type; a type lacking any of the fields is skipped as a whole.
+
+    When no searchable field changes, each type is a single UpdateMany;
+    otherwise every asset gets its own UpdateOne with fresh search_terms.
+    Returns {"matched", "modified", "missing", "skipped": {type: reason}}.
+    """
+    if not changes:
+        raise ValueError("No changes given.")
+
+    touches_search = any(f in SEARCH_FIELDS for f in changes)
+    projection = {"category": 1, **({f: 1 for f in SEARCH_FIELDS} if touches_search else {})}
+    by_type = {}
+    found = 0
+    for doc in collection.find({"_id": {"$in": list(ids)}}, projection):
+        by_type.setdefault(doc.get("category"), []).append(doc)
+        found += 1
+
+    now = utc_now()
+    ops = []
+    skipped = {}
+    for category, assets in by_type.items():
+        entry = type_cache.get(category)
+        if not entry:
+            skipped[category or "—"] = "unknown asset type"
+            continue
+        payload, unknown = build_partial_payload(changes, entry["allowed_fields"])
+        if unknown:
+            skipped[category] = f"no {', '.join(unknown)} field(s) in this type"
+            continue
+        payload["updated_at"] = now
+
+        if touches_search:
+            ops.extend(
+                UpdateOne({"_id": a["_id"]}, {"$set": {**payload, "search_terms": build_search_terms({**a, **payload})}})
+                for a in assets
+            )
+        else:
+            ops.append(UpdateMany({"_id": {"$in": [a["_id"] for a in assets]}}, {"$set": payload}))
+
+    result = collection.bulk_write(ops, ordered=False) if ops else None
+    if result:
+        mark_summary_stale()
+    return {
+        "matched": result.matched_count if result else 0,
+        "modified": result.modified_count if result else 0,
+        "missing": len(set(ids)) - found,
+        "skipped": skipped,
+    }
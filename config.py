@@ -4,3 +4,47 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key'
     WTF_CSRF_ENABLED = True
+    MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')   # mongomock:// for an in-memory database
+    MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'ams')
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))       # per process
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_MS = int(os.environ.get('MONGO_MAX_IDLE_MS', 60000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 0))       # 0 = no timeout
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000))
+    MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')                 # e.g. "zstd,snappy,zlib"
+    MONGO_APP_NAME = os.environ.get('MONGO_APP_NAME', 'ams')
+    ENSURE_INDEXES_ON_STARTUP = os.environ.get('ENSURE_INDEXES_ON_STARTUP', '0') == '1'  # init_db.py builds them; '1' re-checks in the background
+    TYPE_CACHE_TTL = int(os.environ.get('TYPE_CACHE_TTL', 300))
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'             # request timing + GET /metrics
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')                         # scrapers send "Authorization: Bearer <token>"
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'               # '1' serves /metrics without the token or a login
+    MONGO_COMMAND_MONITORING = os.environ.get('MONGO_COMMAND_MONITORING', '1') == '1'  # per-command counts/durations
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))              # log requests slower than this
+    SLOW_COMMAND_MS = int(os.environ.get('SLOW_COMMAND_MS', 250))               # log MongoDB commands slower than this
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+    EXPORT_JOB_DIR = os.environ.get('EXPORT_JOB_DIR', 'export_jobs')
+    EXPORT_JOB_TTL = int(os.environ.get('EXPORT_JOB_TTL', 3600))
+    API_KEYS = [k.strip() for k in os.environ.get('API_KEYS', '').split(',') if k.strip()]  # X-API-Key values for integrations
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+    API_MAX_BULK = int(os.environ.get('API_MAX_BULK', 1000))
+    SUMMARY_TTL = int(os.environ.get('SUMMARY_TTL', 300))                  # recompute at least this often (seconds)
+    SUMMARY_STALE_GRACE = int(os.environ.get('SUMMARY_STALE_GRACE', 10))   # after a write, reuse the old numbers this long
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    BACKUP_DIR = os.environ.get('BACKUP_DIR', 'mongo_backups')
+    BACKUP_FORMAT = os.environ.get('BACKUP_FORMAT', 'bson')            # bson | jsonl
+    BACKUP_COMPRESSION = os.environ.get('BACKUP_COMPRESSION', 'gzip')  # gzip | zstd | none
+    BACKUP_GZIP_LEVEL = int(os.environ.get('BACKUP_GZIP_LEVEL', 6))
+    BACKUP_BATCH_SIZE = int(os.environ.get('BACKUP_BATCH_SIZE', 1000))
+    BACKUP_INCREMENTAL_ENABLED = os.environ.get('BACKUP_INCREMENTAL_ENABLED', '1') == '1'
+    BACKUP_SCHEDULER_ENABLED = os.environ.get('BACKUP_SCHEDULER_ENABLED', '1') == '1'  # one worker at a time runs them, under the backup lease
+    BACKUP_FULL_INTERVAL_HOURS = float(os.environ.get('BACKUP_FULL_INTERVAL_HOURS', 24 * 7))
+    BACKUP_INCREMENTAL_INTERVAL_HOURS = float(os.environ.get('BACKUP_INCREMENTAL_INTERVAL_HOURS', 24))
+    BACKUP_POLL_SECONDS = int(os.environ.get('BACKUP_POLL_SECONDS', 60))
+    BACKUP_LEASE_SECONDS = int(os.environ.get('BACKUP_LEASE_SECONDS', 300))
+    BACKUP_KEEP_CHAINS = int(os.environ.get('BACKUP_KEEP_CHAINS', 4))         # full backups (with their increments) to keep
+    BACKUP_MAX_AGE_DAYS = int(os.environ.get('BACKUP_MAX_AGE_DAYS', 0))       # 0 = no age limit
@@ -0,0 +1,133 @@
+#export_jobs.py
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config import Config
+from models import assets_collection, export_jobs_collection
+from exporters import iter_assets, write_keka_workbook, write_excel_workbook, XLSX_MIMETYPE
+from exporters import write_csv_file, write_parquet_file, write_arrow_file, CSV_MIMETYPE, PARQUET_MIMETYPE, ARROW_MIMETYPE
+
+# kind -> (writer, filename prefix, extension, mimetype)
+EXPORT_KINDS = {
+    "keka": (write_keka_workbook, "KEKA_Asset_Export", ".xlsx", XLSX_MIMETYPE),
+    "excel": (write_excel_workbook, "Asset_Export", ".xlsx", XLSX_MIMETYPE),
+    "csv": (write_csv_file, "Asset_Export", ".csv", CSV_MIMETYPE),
+    "parquet": (write_parquet_file, "Asset_Export", ".parquet", PARQUET_MIMETYPE),
+    "arrow": (write_arrow_file, "Asset_Export", ".arrow", ARROW_MIMETYPE),
+}
+
+# Bounded so concurrent exports queue up instead of competing with page requests
+_executor = ThreadPoolExecutor(max_workers=Config.EXPORT_WORKERS, thread_name_prefix="export")
+
+# Running jobs touch heartbeat_at this often; one silent for EXPORT_JOB_TTL has lost its worker
+HEARTBEAT_SECONDS = max(1, min(60, Config.EXPORT_JOB_TTL / 4))
+
+
+def _job_path(job_id, extension):
+    return os.path.abspath(os.path.join(Config.EXPORT_JOB_DIR, f"{job_id}{extension}"))
+
+
+def _run_job(job_id, kind):
+    writer, _, extension, _ = EXPORT_KINDS[kind]
+    path = _job_path(job_id, extension)
+
+    def progress(rows):
+        export_jobs_collection.update_one({"_id": job_id}, {"$set": {"rows_processed": rows}})
+
+    now = datetime.now()
+    started = export_jobs_collection.update_one(
+        {"_id": job_id, "status": "queued"}, {"$set": {"status": "running", "started_at": now, "heartbeat_at": now}}
+    )
+    if not started.matched_count:
+        return  # failed by prune_jobs while it waited in the queue
+
+    # Separate thread, so a long wb.save() or a slow cursor still counts as alive
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stop), name=f"export-heartbeat-{job_id[:8]}", daemon=True).start()
+    try:
+        with open(path, "wb") as fh:
+            rows = writer(fh, iter_assets(assets_collection), progress=progress)
+        export_jobs_collection.update_one({"_id": job_id}, {"$set": {
+            "status": "done",
+            "rows_processed": rows,
+            "path": path,
+            "finished_at": datetime.now(),
+        }})
+    except Exception as e:
+        if os.path.exists(path):
+            os.remove(path)
+        export_jobs_collection.update_one({"_id": job_id}, {"$set": {
+            "status": "failed",
+            "error": str(e),
+            "finished_at": datetime.now(),
+        }})
+    finally:
+        stop.set()
+
+
+def _heartbeat(job_id, stop):
+    while not stop.wait(HEARTBEAT_SECONDS):
+        export_jobs_collection.update_one(
+            {"_id": job_id, "status": "running"}, {"$set": {"heartbeat_at": datetime.now()}}
+        )
+
+
+def prune_jobs():
+    """
+    Fail jobs queued for longer than EXPORT_JOB_TTL seconds, or running with
+    no heartbeat for that long (their worker died with its process), then
+    drop finished jobs (and their files) older than that.
+    """
+    cutoff = datetime.now() - timedelta(seconds=Config.EXPORT_JOB_TTL)
+    stuck = {"$or": [
+        {"status": "running", "heartbeat_at": {"$lt": cutoff}},
+        {"status": "running", "heartbeat_at": None, "started_at": {"$lt": cutoff}},  # from before heartbeats
+        {"status": "queued", "created_at": {"$lt": cutoff}},
+    ]}
+    export_jobs_collection.update_many(stuck, {"$set": {
+        "status": "failed",
+        "error": f"Did not finish within {Config.EXPORT_JOB_TTL} seconds",
+        "finished_at": datetime.now(),
+    }})
+
+    for job in export_jobs_collection.find({"finished_at": {"$lt": cutoff}}, {"path": 1, "kind": 1}):
+        # Failed jobs have no path recorded, but may have left a partial file behind
+        path = job.get("path") or _job_path(job["_id"], EXPORT_KINDS[job["kind"]][2])
+        if os.path.exists(path):
+            os.remove(path)
+        export_jobs_collection.delete_one({"_id": job["_id"]})
+
+
+def submit_export(kind):
+    """Queue an export and return its job id."""
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+
+    os.makedirs(Config.EXPORT_JOB_DIR, exist_ok=True)
+    prune_jobs()
+
+    job_id = uuid.uuid4().hex
+    export_jobs_collection.insert_one({
+        "_id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "rows_processed": 0,
+        "total": assets_collection.estimated_document_count(),
+        "created_at": datetime.now(),
+    })
+    _executor.submit(_run_job, job_id, kind)
+    return job_id
+
+
+def get_job(job_id):
+    return export_jobs_collection.find_one({"_id": job_id})
+
+
+def job_download(job):
+    """(path, download name, mimetype) for a finished job."""
+    _, prefix, extension, mimetype = EXPORT_KINDS[job["kind"]]
+    download_name = f"{prefix}_{job['created_at'].strftime('%Y%m%d_%H%M%S')}{extension}"
+    return job["path"], download_name, mimetype
@@ -0,0 +1,439 @@
+#exporters.py
+import csv
+import io
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+from config import Config
+from init_db import asset_type_fields
+from type_cache import type_cache
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.file'
+
+# Field types that get a typed column in CSV/columnar exports; everything else is text
+NUMBER_TYPES = {"number", "currency"}
+DATE_TYPES = {"date"}
+
+KEKA_HEADERS = [
+    "Asset ID", "Asset Name", "Asset Description", "Asset Location", "Asset Category",
+    "Asset Type", "Purchased On (dd-mmm-yyyy)", "Warranty Expires On (dd-mmm-yyyy)",
+    "Asset Condition", "Asset Status", "Reason, if Not Available",
+    "Employee Number, if Assigned", "Date of Asset Assignment (dd-mmm-yyyy)"
+]
+
+# First non-empty one becomes the KEKA Asset ID
+KEKA_ID_FIELDS = ["asset_tag", "endpoint_name", "serial_no", "mtr_asset_tag", "monitor_asset_tag", "cpu_asset_tag"]
+# Joined into the KEKA Asset Description
+KEKA_DESC_FIELDS = ["model", "system_model", "ram", "storage"]
+
+COLUMN_WIDTH = 25
+
+
+def iter_assets(collection, query=None, batch_size=None):
+    """Cursor over assets, fetched from the server in batches."""
+    return collection.find(query or {}, {"search_terms": 0}).batch_size(batch_size or Config.EXPORT_BATCH_SIZE)
+
+
+def iter_batches(assets, size=None):
+    """Lists of up to `size` assets from any iterable; a cursor keeps fetching underneath."""
+    size = size or Config.EXPORT_BATCH_SIZE
+    assets = iter(assets)
+    while True:
+        batch = list(islice(assets, size))
+        if not batch:
+            return
+        yield batch
+
+
+# === Row building (shared by the KEKA and Excel writers) ====================
+class RowBuilder:
+    """
+    Turns a batch of asset documents into export rows one column at a time.
+    Each column's source and converter are chosen once per layout, so a batch
+    costs one map() per distinct column instead of per-cell lookups and
+    type checks. Columns repeated in a layout are computed once per batch.
+    """
+
+    def __init__(self, columns):
+        # [(field name or callable(asset), converter(value) or None)]
+        self.columns = columns
+
+    def _column(self, batch, source, convert):
+        if isinstance(source, str):
+            values = [asset.get(source) for asset in batch]
+        else:
+            values = list(map(source, batch))
+        return list(map(convert, values)) if convert else values
+
+    def rows(self, batch):
+        computed = {}
+        columns = []
+        for column in self.columns:
+            if column not in computed:
+                computed[column] = self._column(batch, *column)
+            columns.append(computed[column])
+        return list(zip(*columns))
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ""
+
+
+# Dates repeat heavily across an export (same purchase batches, same hand-over days)
+@lru_cache(maxsize=8192)
+def _keka_date(value):
+    d = to_date(value)
+    return d.strftime("%d-%b-%Y") if d else ""
+
+
+def _keka_asset_id(asset):
+    return next((_text(asset.get(f)) for f in KEKA_ID_FIELDS if asset.get(f)), "")
+
+
+def _keka_description(asset):
+    return "  ".join(d for d in (_text(asset.get(f)) for f in KEKA_DESC_FIELDS) if d)
+
+
+def _keka_location(asset):
+    area, state = _text(asset.get("area")), _text(asset.get("state"))
+    return f"{area} ({state})" if state else area
+
+
+def _keka_employee(asset):
+    username, user_code = _text(asset.get("username")), _text(asset.get("user_code"))
+    return f"{username} ({user_code})" if user_code else username
+
+
+def _keka_category(asset):
+    return "IT assets"
+
+
+# One entry per KEKA_HEADERS column
+KEKA_ROW_BUILDER = RowBuilder([
+    (_keka_asset_id, None),
+    ("category", _text),          # Asset Name
+    (_keka_description, None),    # model + system_model + ram + storage
+    (_keka_location, None),       # area (state)
+    (_keka_category, None),
+    ("category", _text),          # Asset Type
+    ("given_date", _keka_date),   # Purchased On
+    ("warranty_expiry", _keka_date),
+    ("status", _text),            # Condition
+    ("status", _text),            # Status
+    ("status", _text),            # Reason
+    (_keka_employee, None),       # username (user_code)
+    ("given_date", _keka_date),   # Assignment date
+])
+
+
+EXCEL_DATE_FORMAT = "DD-MM-YYYY"
+EXCEL_NUMBER_FORMAT = "#,##0.00"
+EXCEL_CURRENCY_FORMAT = '"₹"#,##0.00'
+
+
+def _excel_text(value):
+    return "" if value is None else str(value)
+
+
+@lru_cache(maxsize=8192)
+def _excel_date(value):
+    # Typed dates become real Excel dates; legacy text that doesn't parse stays text
+    return to_date(value) or _excel_text(value)
+
+
+def _excel_number(value):
+    number = to_number(value)
+    return _excel_text(value) if number is None else number
+
+
+# dtype -> (converter, number format)
+EXCEL_COLUMN_TYPES = {
+    "date": (_excel_date, EXCEL_DATE_FORMAT),
+    "number": (_excel_number, EXCEL_NUMBER_FORMAT),
+    "currency": (_excel_number, EXCEL_CURRENCY_FORMAT),
+}
+
+
+def excel_layout(fields):
+    """(RowBuilder, [number format or None per column]) for one asset type's sheet."""
+    columns, formats = [], []
+    for field in fields:
+        convert, number_format = EXCEL_COLUMN_TYPES.get(field.get("type", "text"), (_excel_text, None))
+        columns.append((field["name"], convert))
+        formats.append(number_format)
+    return RowBuilder(columns), formats
+
+
+def _header_row(ws, headers, font, alignment, fill=None):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    cells = []
+    for col_num, header in enumerate(headers, 1):
+        # Write-only sheets need widths set before the first row is written
+        ws.column_dimensions[get_column_letter(col_num)].width = COLUMN_WIDTH
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = font
+        cell.alignment = alignment
+        if fill:
+            cell.fill = fill
+        cells.append(cell)
+    ws.append(cells)
+
+
+def write_keka_workbook(fileobj, assets, progress=None):
+    """Stream assets into a single-sheet KEKA workbook. Returns the row count."""
+    # openpyxl is imported on first export rather than at app startup
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("KEKA Export")
+    _header_row(ws, KEKA_HEADERS, Font(bold=True, name="Calibri"), Alignment(wrap_text=True, vertical="top"))
+
+    count = 0
+    for batch in iter_batches(assets):
+        for row in KEKA_ROW_BUILDER.rows(batch):
+            ws.append(row)
+        count += len(batch)
+        if progress:
+            progress(count)
+
+    wb.save(fileobj)
+    if progress:
+        progress(count)
+    return count
+
+
+def write_excel_workbook(fileobj, assets, progress=None):
+    """Stream assets into one sheet per known asset type. Returns the row count."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    wb = Workbook(write_only=True)
+
+    header_font = Font(bold=True, color="FFFFFF", name="Calibri")
+    fill = PatternFill(start_color="043251", end_color="043251", fill_type="solid")
+    align_wrap = Alignment(wrap_text=True, vertical="top")
+
+    sheets = {}
+    count = 0
+    for batch in iter_batches(assets):
+        by_type = {}
+        for asset in batch:
+            by_type.setdefault(_text(asset.get("category")) or "Unknown", []).append(asset)
+
+        for asset_type, group in by_type.items():
+            if asset_type not in sheets:
+                fields = asset_type_fields.get(asset_type)
+                if not fields:
+                    sheets[asset_type] = None  # Skip unknown types not in asset_type_fields
+                    continue
+                ws = wb.create_sheet(title=asset_type)
+                _header_row(ws, [f["label"] for f in fields], header_font, align_wrap, fill)
+                sheets[asset_type] = (ws, *excel_layout(fields))
+
+            sheet = sheets[asset_type]
+            if sheet is None:
+                continue
+            ws, builder, formats = sheet
+
+            for values in builder.rows(group):
+                row = []
+                for value, number_format in zip(values, formats):
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.alignment = align_wrap
+                    # Text that didn't parse as a date/number stays plain text
+                    if number_format and not isinstance(value, str):
+                        cell.number_format = number_format
+                    row.append(cell)
+                ws.append(row)
+
+        count += len(batch)
+        if progress:
+            progress(count)
+
+    if not wb.worksheets:
+        wb.create_sheet("Assets")  # A workbook must contain at least one sheet
+    wb.save(fileobj)
+    if progress:
+        progress(count)
+    return count
+
+
+def spool_export(writer, assets):
+    """Run `writer` into an anonymous temp file and return it rewound for reading."""
+    tmp = tempfile.TemporaryFile()
+    writer(tmp, assets)
+    tmp.seek(0)
+    return tmp
+
+
+# === Flat exports (CSV / Parquet / Arrow) ===================================
+def export_columns(category=None):
+    """
+    [(name, dtype)] for a flat export: the type's own fields when `category`
+    is given, otherwise the union of every field in asset_type_fields.
+    """
+    if category:
+        entry = type_cache.get(category)
+        fields = entry["fields"] if entry else asset_type_fields.get(category, [])
+    else:
+        fields = [f for type_fields in asset_type_fields.values() for f in type_fields]
+
+    # warranty_expiry is derived from the type's warranty, so it's on assets whose type doesn't list it
+    columns = [("_id", "text"), ("category", "text"), ("warranty_expiry", "date")]
+    seen = {"_id", "category", "warranty_expiry"}
+    for field in fields:
+        if field["name"] not in seen:
+            seen.add(field["name"])
+            columns.append((field["name"], field.get("type", "text")))
+    return columns
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str) and value.strip():
+        try:
+            return datetime.strptime(value.strip(), "%d-%m-%Y").date()
+        except ValueError:
+            return None
+    return None
+
+
+def to_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and value.strip():
+        try:
+            return float(value.replace("₹", "").replace(",", "").strip())
+        except ValueError:
+            return None
+    return None
+
+
+def typed_value(value, dtype):
+    if dtype in DATE_TYPES:
+        return to_date(value)
+    if dtype in NUMBER_TYPES:
+        return to_number(value)
+    return None if value is None or value == "" else str(value)
+
+
+def iter_csv_chunks(assets, columns, progress=None):
+    """Yield CSV text a batch at a time; dates are ISO formatted, numbers plain."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+
+    count = 0
+    for asset in assets:
+        row = []
+        for name, dtype in columns:
+            value = typed_value(asset.get(name), dtype)
+            row.append("" if value is None else value.isoformat() if dtype in DATE_TYPES else value)
+        writer.writerow(row)
+        count += 1
+
+        if count % Config.EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if progress:
+                progress(count)
+
+    yield buffer.getvalue()
+    if progress:
+        progress(count)
+
+
+def write_csv_file(fileobj, assets, progress=None, category=None):
+    """Binary-file variant of iter_csv_chunks for background jobs. Returns the row count."""
+    count = 0
+
+    def track(rows):
+        nonlocal count
+        count = rows
+        if progress:
+            progress(rows)
+
+    for chunk in iter_csv_chunks(assets, export_columns(category), progress=track):
+        fileobj.write(chunk.encode("utf-8"))
+    return count
+
+
+def _arrow_schema(pa, columns):
+    def arrow_type(dtype):
+        if dtype in DATE_TYPES:
+            return pa.date32()
+        if dtype in NUMBER_TYPES:
+            return pa.float64()
+        return pa.string()
+    return pa.schema([(name, arrow_type(dtype)) for name, dtype in columns])
+
+
+def _iter_record_batches(pa, schema, assets, columns, progress=None):
+    batch = []
+    count = 0
+    for asset in assets:
+        batch.append(asset)
+        count += 1
+        if len(batch) >= Config.EXPORT_BATCH_SIZE:
+            yield _record_batch(pa, schema, batch, columns)
+            batch = []
+            if progress:
+                progress(count)
+    if batch:
+        yield _record_batch(pa, schema, batch, columns)
+    if progress:
+        progress(count)
+
+
+def _record_batch(pa, schema, batch, columns):
+    arrays = [
+        pa.array([typed_value(asset.get(name), dtype) for asset in batch], type=schema.field(name).type)
+        for name, dtype in columns
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("pyarrow is not installed; run `pip install pyarrow` to enable Parquet/Arrow exports.")
+    return pyarrow
+
+
+def write_parquet_file(fileobj, assets, progress=None, category=None):
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    columns = export_columns(category)
+    schema = _arrow_schema(pa, columns)
+    count = 0
+    with pq.ParquetWriter(fileobj, schema, compression="zstd") as writer:
+        for record_batch in _iter_record_batches(pa, schema, assets, columns, progress):
+            writer.write_batch(record_batch)
+            count += record_batch.num_rows
+    return count
+
+
+def write_arrow_file(fileobj, assets, progress=None, category=None):
+    pa = _require_pyarrow()
+
+    columns = export_columns(category)
+    schema = _arrow_schema(pa, columns)
+    count = 0
+    with pa.ipc.new_file(fileobj, schema) as writer:
+        for record_batch in _iter_record_batches(pa, schema, assets, columns, progress):
+            writer.write_batch(record_batch)
+            count += record_batch.num_rows
+    return count
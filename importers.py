@@ -0,0 +1,281 @@
+#importers.py
+import hashlib
+from datetime import datetime
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from models import assets_collection
+from search import build_search_terms, refresh_search_terms
+from summary import mark_summary_stale
+from type_cache import type_cache
+from warranty import apply_warranty, WARRANTY_FIELDS
+from utils import DATE_FIELDS, MONEY_FIELDS, parse_ddmmyyyy_to_date, clean_money, build_asset_payload, utc_now
+
+# Identifiers that mark two rows as the same physical asset
+KEY_FIELDS = ["serial_no", "asset_tag", "imei1", "mtr_asset_tag"]
+
+# Row classifications
+INSERT, UPDATE, DUPLICATE, CONFLICT = "insert", "update", "duplicate", "conflict"
+
+# Keep the rendered report bounded on very dirty sheets
+MAX_REPORTED_ERRORS = 500
+MAX_REPORTED_ROWS = 500
+
+
+def resolve_sheet_type(sheet_name):
+    """Stored type entry for a sheet name (exact, then case-insensitive)."""
+    entry = type_cache.get(sheet_name.strip())
+    if entry:
+        return entry
+    wanted = sheet_name.strip().lower()
+    for type_name in type_cache.type_names():
+        if type_name.lower() == wanted:
+            return type_cache.get(type_name)
+    return None
+
+
+def map_headers(header_row, entry):
+    """Column index -> field name, matching either the field label or its name."""
+    lookup = {}
+    for field in entry["fields"]:
+        lookup[field["label"].strip().lower()] = field["name"]
+        lookup[field["name"].lower()] = field["name"]
+
+    mapping = {}
+    for idx, header in enumerate(header_row):
+        if header is None:
+            continue
+        name = lookup.get(str(header).strip().lower())
+        if name:
+            mapping[idx] = name
+    return mapping
+
+
+def cell_to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d-%m-%Y")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def row_to_raw(values, mapping):
+    return {name: cell_to_text(values[idx]) for idx, name in mapping.items() if idx < len(values)}
+
+
+def validate_raw(raw, entry):
+    """Problems that would otherwise be stored silently as bad strings."""
+    problems = []
+    labels = {f["name"]: f["label"] for f in entry["fields"]}
+    for field in DATE_FIELDS:
+        value = raw.get(field, "")
+        if value and not parse_ddmmyyyy_to_date(value):
+            problems.append(f"{labels.get(field, field)}: '{value}' is not a dd-mm-yyyy date")
+    for field in MONEY_FIELDS:
+        value = raw.get(field, "")
+        if value:
+            try:
+                float(clean_money(value))
+            except ValueError:
+                problems.append(f"{labels.get(field, field)}: '{value}' is not a number")
+    return problems
+
+
+def _norm_key(value):
+    return str(value).strip().lower() if value not in (None, "") else ""
+
+
+def _content_hash(doc, fields):
+    joined = "\x1f".join(str(doc.get(f, "")) for f in fields)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+class KeyIndex:
+    """
+    In-memory map of identifier values (and, for rows without any, content
+    hashes) to existing assets of one category, loaded with a single
+    projection query, plus the keys already claimed by earlier rows of the
+    same import.
+    """
+
+    def __init__(self, category, compare_fields):
+        self.category = category
+        self.compare_fields = sorted(compare_fields)
+        self.by_key = {}     # (field, normalized value) -> _id
+        self.hashes = {}     # _id -> content hash over compare_fields
+        self.claimed = {}    # (field, normalized value) -> row number
+        self.claimed_ids = {}  # existing _id -> row number
+        self.by_hash = {}    # content hash -> [_id, ...] not yet matched by a row without identifiers
+        self.warranty = {}   # _id -> stored WARRANTY_FIELDS, for updates that touch them
+
+        projection = {f: 1 for f in set(KEY_FIELDS) | set(self.compare_fields) | set(WARRANTY_FIELDS)}
+        for doc in assets_collection.find({"category": category}, projection).batch_size(Config.IMPORT_BATCH_SIZE):
+            for field in KEY_FIELDS:
+                key = _norm_key(doc.get(field))
+                if key:
+                    self.by_key.setdefault((field, key), doc["_id"])
+            self.hashes[doc["_id"]] = _content_hash(doc, self.compare_fields)
+            self.by_hash.setdefault(self.hashes[doc["_id"]], []).append(doc["_id"])
+            self.warranty[doc["_id"]] = {f: doc[f] for f in WARRANTY_FIELDS if f in doc}
+
+    def row_keys(self, payload):
+        return [(f, _norm_key(payload.get(f))) for f in KEY_FIELDS if _norm_key(payload.get(f))]
+
+    def classify(self, payload, row_number):
+        """(action, existing _id or None, reason)"""
+        keys = self.row_keys(payload)
+        matches = {self.by_key[k] for k in keys if k in self.by_key}
+        if len(matches) > 1:
+            return CONFLICT, None, "identifiers match different existing assets"
+
+        for key in keys:
+            if key in self.claimed:
+                return DUPLICATE, None, f"{key[0]} '{key[1]}' already used by row {self.claimed[key]}"
+        for key in keys:
+            self.claimed[key] = row_number
+
+        if not keys:
+            # Nothing to match on: each identical existing asset absorbs one such row, so
+            # re-importing a sheet writes nothing while identical rows in it still all count
+            same = self.by_hash.get(_content_hash(payload, self.compare_fields))
+            if same:
+                return DUPLICATE, same.pop(), "identical to an existing asset"
+        if not matches:
+            return INSERT, None, ""
+
+        existing_id = matches.pop()
+        if existing_id in self.claimed_ids:
+            return DUPLICATE, None, f"same asset as row {self.claimed_ids[existing_id]}"
+        self.claimed_ids[existing_id] = row_number
+        if self.hashes.get(existing_id) == _content_hash(payload, self.compare_fields):
+            return DUPLICATE, existing_id, "identical to an existing asset"
+        return UPDATE, existing_id, ""
+
+
+class ImportReport:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.inserted = 0
+        self.updated = 0
+        self.counts = {INSERT: 0, UPDATE: 0, DUPLICATE: 0, CONFLICT: 0}
+        self.skipped_sheets = []
+        self.sheets = []
+        self.rows = []
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, sheet, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"sheet": sheet, "row": row, "message": message})
+
+    def add_row(self, sheet, row, action, reason):
+        self.counts[action] += 1
+        # Plain inserts/updates are the expected case; list what needs a look
+        if (reason or action == CONFLICT) and len(self.rows) < MAX_REPORTED_ROWS:
+            self.rows.append({"sheet": sheet, "row": row, "action": action, "reason": reason})
+
+
+def _write_op(action, existing_id, payload, mapped_fields, keys, entry, current):
+    if action == UPDATE:
+        # Only overwrite the columns the sheet actually supplied
+        changes = apply_warranty({f: payload[f] for f in mapped_fields if f in payload}, entry, current)
+        changes["updated_at"] = payload["updated_at"]
+        return UpdateOne({"_id": existing_id}, {"$set": changes})
+    payload = apply_warranty(payload, entry)
+    if keys:
+        field = keys[0][0]
+        return UpdateOne({"category": entry["type_name"], field: payload[field]}, {"$set": payload}, upsert=True)
+    return InsertOne(payload)
+
+
+def _flush(batch, sheet_name, report):
+    """Apply a batch unordered; failed documents become row errors."""
+    if not batch:
+        return
+    ops = [op for _, op, _ in batch]
+    updated_ids = [existing_id for _, _, existing_id in batch if existing_id]
+    try:
+        result = assets_collection.bulk_write(ops, ordered=False)
+        report.inserted += result.inserted_count + result.upserted_count
+        report.updated += result.modified_count
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            report.add_error(sheet_name, batch[err["index"]][0], err.get("errmsg", "write failed"))
+        report.inserted += e.details.get("nInserted", 0) + e.details.get("nUpserted", 0)
+        report.updated += e.details.get("nModified", 0)
+    if updated_ids:
+        refresh_search_terms(assets_collection, updated_ids)
+    mark_summary_stale()
+
+
+def import_workbook(fileobj, dry_run=False, batch_size=None):
+    """
+    Stream every sheet of an .xlsx into assets. Rows are classified against
+    existing serial/asset-tag/IMEI keys; a dry run only reports the
+    classification. Bad rows are reported, not fatal.
+    """
+    from openpyxl import load_workbook
+
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    report = ImportReport(dry_run=dry_run)
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+
+    try:
+        for ws in wb.worksheets:
+            entry = resolve_sheet_type(ws.title)
+            if not entry:
+                report.skipped_sheets.append(ws.title)
+                continue
+
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            mapping = map_headers(header or [], entry)
+            if not mapping:
+                report.add_error(ws.title, 1, "No column headers match this asset type's fields")
+                continue
+
+            category = entry["type_name"]
+            mapped_fields = sorted(set(mapping.values()))
+            key_index = KeyIndex(category, mapped_fields)
+            sheet_counts = {INSERT: 0, UPDATE: 0, DUPLICATE: 0, CONFLICT: 0}
+
+            batch = []
+            for row_number, values in enumerate(rows, start=2):
+                if not values or all(v is None or str(v).strip() == "" for v in values):
+                    continue
+
+                raw = row_to_raw(values, mapping)
+                problems = validate_raw(raw, entry)
+                if problems:
+                    report.add_error(ws.title, row_number, "; ".join(problems))
+                    continue
+
+                payload = build_asset_payload(raw, entry["field_names"], category)
+                payload["search_terms"] = build_search_terms(payload)
+                payload["updated_at"] = utc_now()
+
+                action, existing_id, reason = key_index.classify(payload, row_number)
+                report.add_row(ws.title, row_number, action, reason)
+                sheet_counts[action] += 1
+                if dry_run or action in (DUPLICATE, CONFLICT):
+                    continue
+
+                op = _write_op(
+                    action, existing_id, payload, mapped_fields, key_index.row_keys(payload),
+                    entry, key_index.warranty.get(existing_id),
+                )
+                batch.append((row_number, op, existing_id))
+                if len(batch) >= batch_size:
+                    _flush(batch, ws.title, report)
+                    batch = []
+
+            _flush(batch, ws.title, report)
+            report.sheets.append({"sheet": ws.title, "type": category, **sheet_counts})
+    finally:
+        wb.close()
+
+    return report
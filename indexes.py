@@ -0,0 +1,101 @@
+#indexes.py
+from pymongo import IndexModel, ASCENDING, TEXT
+from pymongo.collation import Collation
+from pymongo.errors import OperationFailure
+
+from search import SEARCH_FIELDS, TEXT_INDEX_NAME
+
+# Case-insensitive comparison used for usernames (index and lookups must match)
+USERNAME_COLLATION = Collation(locale="en", strength=2)
+
+# Every index the app relies on, per collection
+REQUIRED_INDEXES = {
+    "asset_types": [
+        IndexModel([("type_name", ASCENDING)], unique=True),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True, collation=USERNAME_COLLATION),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "assets": [
+        # Facet filters
+        IndexModel([("category", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("state", ASCENDING)]),
+        # Identifier lookups
+        IndexModel([("serial_no", ASCENDING)]),
+        IndexModel([("asset_tag", ASCENDING)]),
+        # Dashboard sort orders (sort key + _id tiebreaker)
+        IndexModel([("category", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("given_date", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("_id", ASCENDING)]),
+        # Date-range filters; warranty_expiry + _id also pages the expiring report
+        IndexModel([("purchase_date", ASCENDING)]),
+        IndexModel([("collected_date", ASCENDING)]),
+        IndexModel([("warranty_expiry", ASCENDING), ("_id", ASCENDING)]),
+        # Search
+        IndexModel([("search_terms", ASCENDING)]),
+        IndexModel([(f, TEXT) for f in SEARCH_FIELDS], name=TEXT_INDEX_NAME),
+        # Incremental backups
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """
+    Create any missing required indexes. Safe to run repeatedly.
+    Returns {collection: [error messages]} for indexes that could not be built.
+    """
+    errors = {}
+    for coll_name, models in REQUIRED_INDEXES.items():
+        collection = db[coll_name]
+        for model in models:
+            # One at a time so a single conflict doesn't block the rest
+            try:
+                collection.create_indexes([model])
+            except OperationFailure as e:
+                errors.setdefault(coll_name, []).append(f"{model.document['name']}: {e}")
+    return errors
+
+
+def _index_usage(collection):
+    """{index name: ops since server start}, or None when $indexStats isn't available."""
+    try:
+        return {s["name"]: s["accesses"]["ops"] for s in collection.aggregate([{"$indexStats": {}}])}
+    except Exception:
+        return None
+
+
+def index_report(db):
+    """Missing, undeclared and unused indexes for each managed collection."""
+    report = {}
+    for coll_name, models in REQUIRED_INDEXES.items():
+        collection = db[coll_name]
+        declared = {m.document["name"] for m in models}
+        existing = set(collection.index_information()) - {"_id_"}
+        usage = _index_usage(collection)
+
+        report[coll_name] = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared),
+            "unused": sorted(n for n in existing if usage.get(n) == 0) if usage is not None else None,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from models import db
+
+    if "--apply" in sys.argv:
+        for coll_name, messages in ensure_indexes(db).items():
+            for message in messages:
+                print(f"❌ {coll_name}.{message}")
+
+    for coll_name, info in index_report(db).items():
+        print(f"\n[{coll_name}]")
+        print("  missing:   ", ", ".join(info["missing"]) or "—")
+        print("  undeclared:", ", ".join(info["undeclared"]) or "—")
+        unused = info["unused"]
+        print("  unused:    ", "n/a" if unused is None else (", ".join(unused) or "—"))
@@ -1,14 +1,10 @@
-from pymongo import MongoClient
 from getpass import getpass
 from werkzeug.security import generate_password_hash
-
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client["ams"]
-
-# Collections
-users_collection = db["users"]
-asset_types_collection = db["asset_types"]
+from models import db, users_collection, asset_types_collection, assets_collection
+from search import backfill_search_terms
+from indexes import ensure_indexes
+from migrate_types import migrate_types, backfill_warranty
+from utils import utc_now
 
 # Asset type field definitions
 asset_type_fields = {
@@ -315,20 +311,42 @@ asset_type_fields = {
   ]
 }
 
-# Insert asset types into DB if not already present
-for asset_type, fields in asset_type_fields.items():
-    if not asset_types_collection.find_one({"type_name": asset_type}):
-        asset_types_collection.insert_one({"type_name": asset_type, "fields": fields})
 
-print("\n✅ Asset types initialized successfully.")
+def seed_asset_types():
+    """Insert the built-in asset types that aren't in the database yet."""
+    for asset_type, fields in asset_type_fields.items():
+        if not asset_types_collection.find_one({"type_name": asset_type}):
+            asset_types_collection.insert_one({"type_name": asset_type, "fields": fields, "updated_at": utc_now()})
+
+
+def main():
+    seed_asset_types()
+    print("\n✅ Asset types initialized successfully.")
+
+    # Indexes (idempotent)
+    for coll_name, messages in ensure_indexes(db).items():
+        for message in messages:
+            print(f"❌ Index on {coll_name} failed: {message}")
+    print("\n✅ Indexes verified.")
+
+    print(f"ℹ️ Backfilled search terms on {backfill_search_terms(assets_collection)} asset(s).")
+    converted = migrate_types(assets_collection, apply=True)
+    print(f"ℹ️ Converted string dates/amounts on {converted['modified']} asset(s).")
+    warranties = backfill_warranty(assets_collection, asset_types_collection, apply=True)
+    print(f"ℹ️ Backfilled warranty expiry on {sum(warranties.values())} asset(s).")
+
+    # Admin setup (safe interactive)
+    if users_collection.count_documents({}) == 0:
+        print("\n--- Admin Setup ---")
+        username = input("Enter admin username: ").strip().lower()
+        password = getpass("Enter admin password: ")
+        hashed_password = generate_password_hash(password)
+        users_collection.insert_one({"username": username, "password": hashed_password, "updated_at": utc_now()})
+        print("\n✅ Admin user created successfully.")
+    else:
+        print("\nℹ️ Admin user(s) already exists. Skipping user creation.")
+
 
-# Admin setup (safe interactive)
-if users_collection.count_documents({}) == 0:
-    print("\n--- Admin Setup ---")
-    username = input("Enter admin username: ").strip().lower()
-    password = getpass("Enter admin password: ")
-    hashed_password = generate_password_hash(password)
-    users_collection.insert_one({"username": username, "password": hashed_password})
-    print("\n✅ Admin user created successfully.")
-else:
-    print("\nℹ️ Admin user(s) already exists. Skipping user creation.")
+# Seeding only runs from the command line (python init_db.py), never on import
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#instrumentation.py
+"""
+Request and MongoDB metrics for this process, exposed in Prometheus text
+format at /metrics. Every request gets a latency observation and a tally
+of the Mongo commands it ran (through a pymongo CommandListener and a
+context variable); requests and commands over their thresholds are logged.
+
+Counters are per process: with several gunicorn/uvicorn workers each one
+keeps its own, and a scrape through the shared port reaches whichever
+worker answers. Scrape each worker separately (its own port or target) and
+sum in PromQL, or run a single worker when the numbers matter.
+"""
+import contextvars
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from flask import Response, g, request, session
+from pymongo import monitoring
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the default Prometheus client buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Mongo commands per request; a climb here usually means a query inside a loop
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+# === Registry ===============================================================
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe counters and histograms keyed by label tuples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency = {}    # (method, endpoint, status) -> Histogram
+        self.request_commands = {}   # (endpoint,) -> Histogram
+        self.slow_requests = {}      # (endpoint,) -> count
+        self.commands = {}           # (command, collection) -> count
+        self.command_seconds = {}    # (command, collection) -> seconds
+        self.command_failures = {}   # (command, collection) -> count
+        self.documents = {}          # (collection,) -> documents returned
+
+    def observe_request(self, method, endpoint, status, seconds, commands=None, slow=False):
+        with self._lock:
+            self.request_latency.setdefault((method, endpoint, str(status)), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if commands is not None:
+                self.request_commands.setdefault((endpoint,), Histogram(COMMAND_COUNT_BUCKETS)).observe(commands)
+            if slow:
+                self.slow_requests[(endpoint,)] = self.slow_requests.get((endpoint,), 0) + 1
+
+    def observe_command(self, command, collection, seconds, documents, failed=False):
+        key = (command, collection)
+        with self._lock:
+            self.commands[key] = self.commands.get(key, 0) + 1
+            self.command_seconds[key] = self.command_seconds.get(key, 0.0) + seconds
+            if failed:
+                self.command_failures[key] = self.command_failures.get(key, 0) + 1
+            if documents:
+                self.documents[(collection,)] = self.documents.get((collection,), 0) + documents
+
+    def render(self, extra=()):
+        """Prometheus text exposition of everything recorded, plus `extra` (name, type, help, {labels: value})."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, help_text, label_names, data):
+            family(name, "histogram", help_text)
+            for labels, hist in sorted(data.items()):
+                base = _labels(label_names, labels)
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{base}}} {hist.sum:.6f}")
+                lines.append(f"{name}_count{{{base}}} {hist.count}")
+
+        def simple(name, kind, help_text, label_names, data):
+            family(name, kind, help_text)
+            for labels, value in sorted(data.items()):
+                base = _labels(label_names, labels)
+                lines.append(f"{name}{{{base}}} {value}" if base else f"{name} {value}")
+
+        with self._lock:
+            histogram("aims_http_request_duration_seconds", "Request latency.",
+                      ("method", "endpoint", "status"), self.request_latency)
+            histogram("aims_http_request_mongo_commands", "MongoDB commands run per request.",
+                      ("endpoint",), self.request_commands)
+            simple("aims_http_slow_requests_total", "counter", f"Requests slower than {Config.SLOW_REQUEST_MS} ms.",
+                   ("endpoint",), self.slow_requests)
+            simple("aims_mongo_commands_total", "counter", "MongoDB commands run.",
+                   ("command", "collection"), self.commands)
+            simple("aims_mongo_command_seconds_total", "counter", "Time spent in MongoDB commands.",
+                   ("command", "collection"), {k: f"{v:.6f}" for k, v in self.command_seconds.items()})
+            simple("aims_mongo_command_failures_total", "counter", "MongoDB commands that failed.",
+                   ("command", "collection"), self.command_failures)
+            simple("aims_mongo_documents_returned_total", "counter", "Documents returned by MongoDB cursors.",
+                   ("collection",), self.documents)
+
+        for name, kind, help_text, values in extra:
+            simple(name, kind, help_text, (), {(): values})
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+metrics = Metrics()
+
+
+# === MongoDB command monitoring =============================================
+class RequestStats:
+    """Mongo work done on behalf of one request."""
+
+    __slots__ = ("commands", "seconds", "documents", "by_collection")
+
+    def __init__(self):
+        self.commands = 0
+        self.seconds = 0.0
+        self.documents = 0
+        self.by_collection = {}
+
+    def add(self, collection, seconds, documents):
+        self.commands += 1
+        self.seconds += seconds
+        self.documents += documents
+        count, total = self.by_collection.get(collection, (0, 0.0))
+        self.by_collection[collection] = (count + 1, total + seconds)
+
+
+def _collection_of(command_name, command):
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+def _documents_returned(reply):
+    cursor = reply.get("cursor") if isinstance(reply, Mapping) else None
+    if not isinstance(cursor, Mapping):
+        return 0
+    return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Counts every command per (command, collection) and adds it to the current
+    request's RequestStats. pymongo calls listeners on the thread running the
+    operation, so the request's context variable is visible here.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = _collection_of(event.command_name, event.command)
+
+    def _finish(self, event, documents, failed):
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1e6
+        metrics.observe_command(event.command_name, collection, seconds, documents, failed=failed)
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.add(collection, seconds, documents)
+        if seconds * 1000 >= Config.SLOW_COMMAND_MS:
+            logger.warning("Slow MongoDB %s on %s: %.0f ms", event.command_name, collection or "-", seconds * 1000)
+
+    def succeeded(self, event):
+        self._finish(event, _documents_returned(event.reply), failed=False)
+
+    def failed(self, event):
+        self._finish(event, 0, failed=True)
+
+
+command_listener = CommandMetrics()
+
+
+def event_listeners():
+    """Listeners for MongoClient(event_listeners=...); empty when monitoring is off."""
+    return [command_listener] if Config.MONGO_COMMAND_MONITORING else []
+
+
+# === Request hooks ==========================================================
+def record_request(method, path, endpoint, status, seconds, stats):
+    """Observe one finished request and log it when it crossed SLOW_REQUEST_MS."""
+    slow = seconds * 1000 >= Config.SLOW_REQUEST_MS
+    metrics.observe_request(
+        method, endpoint, status, seconds,
+        commands=stats.commands if stats and Config.MONGO_COMMAND_MONITORING else None,
+        slow=slow,
+    )
+    if not slow:
+        return
+    stats = stats or RequestStats()
+    breakdown = ", ".join(
+        f"{name or '-'}: {count} in {total * 1000:.0f} ms" for name, (count, total) in sorted(stats.by_collection.items())
+    )
+    logger.warning(
+        "Slow request %s %s (%s) -> %s in %.0f ms; mongo: %d commands, %.0f ms, %d docs%s",
+        method, path, endpoint, status, seconds * 1000,
+        stats.commands, stats.seconds * 1000, stats.documents, f" [{breakdown}]" if breakdown else "",
+    )
+
+
+def begin_request():
+    """Start a RequestStats for the current context; returns the token end_request() needs."""
+    return _request_stats.set(RequestStats())
+
+
+def end_request(token):
+    stats = _request_stats.get()
+    _request_stats.reset(token)
+    return stats
+
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+    g._metrics_token = begin_request()
+
+
+def _after_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is not None:
+        record_request(
+            request.method, request.path, request.endpoint or "unmatched",
+            response.status_code, time.perf_counter() - started, _request_stats.get(),
+        )
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop("_metrics_token", None)
+    if token is not None:
+        end_request(token)
+
+
+def _metrics_allowed():
+    if Config.METRICS_PUBLIC or "user_id" in session:
+        return True
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return bool(Config.METRICS_TOKEN) and hmac.compare_digest(supplied, Config.METRICS_TOKEN)
+
+
+def metrics_view():
+    if not _metrics_allowed():
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+    from flask import current_app
+    from type_cache import type_cache
+
+    cache = type_cache.stats()
+    extra = [
+        ("aims_type_cache_hits_total", "counter", "Asset type cache hits.", cache["hits"]),
+        ("aims_type_cache_misses_total", "counter", "Asset type cache misses.", cache["misses"]),
+        ("aims_type_cache_invalidations_total", "counter", "Asset type cache invalidations.", cache["invalidations"]),
+        ("aims_type_cache_entries", "gauge", "Asset types currently cached.", cache["entries"]),
+        ("aims_app_startup_seconds", "gauge", "create_app() time including imports.",
+         current_app.config.get("STARTUP_SECONDS", 0)),
+    ]
+    return Response(metrics.render(extra), mimetype="text/plain; version=0.0.4")
+
+
+def init_instrumentation(app):
+    """Per-request timing, Mongo tallies, slow-request logs and GET /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
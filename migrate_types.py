@@ -0,0 +1,103 @@
+#migrate_types.py
+"""
+One-time conversion of assets written before dates and amounts were stored
+typed: "dd-mm-yyyy" strings become BSON dates, "1234.50" strings become
+numbers and blanks become null. Values that don't parse are left as they are
+and reported. Then warranty_expiry is backfilled for types with warranty_months.
+
+    python migrate_types.py            # dry run: count what would change
+    python migrate_types.py --apply    # write in batches
+"""
+from pymongo import UpdateOne
+
+from config import Config
+from type_cache import build_type_entry
+from utils import DATE_FIELDS, MONEY_FIELDS, to_stored_date, to_stored_money, utc_now
+from warranty import refresh_type_warranty
+
+TYPED_FIELDS = DATE_FIELDS + MONEY_FIELDS
+
+# Reported per field; the totals keep counting past this
+MAX_REPORTED_VALUES = 20
+
+
+def legacy_query():
+    """Assets with at least one date/money field still stored as a string."""
+    return {"$or": [{f: {"$type": "string"}} for f in TYPED_FIELDS]}
+
+
+def typed_changes(doc):
+    """({field: typed value} for the convertible strings, {field: value} that don't parse)."""
+    changes, unparsed = {}, {}
+    for field in TYPED_FIELDS:
+        value = doc.get(field)
+        if not isinstance(value, str):
+            continue
+        typed = to_stored_date(value) if field in DATE_FIELDS else to_stored_money(value)
+        if isinstance(typed, str):
+            unparsed[field] = value
+        else:
+            changes[field] = typed
+    return changes, unparsed
+
+
+def migrate_types(collection, apply=False, batch_size=None):
+    """
+    Convert legacy string dates/amounts in batches of unordered UpdateOnes.
+    Returns {"scanned", "converted", "modified", "unparsed": {field: [values]}, "unparsed_count"}.
+    """
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    projection = {f: 1 for f in TYPED_FIELDS}
+    report = {"scanned": 0, "converted": 0, "modified": 0, "unparsed": {}, "unparsed_count": 0}
+
+    def flush(ops):
+        if apply and ops:
+            report["modified"] += collection.bulk_write(ops, ordered=False).modified_count
+
+    ops = []
+    for doc in collection.find(legacy_query(), projection).batch_size(batch_size):
+        report["scanned"] += 1
+        changes, unparsed = typed_changes(doc)
+        for field, value in unparsed.items():
+            report["unparsed_count"] += 1
+            values = report["unparsed"].setdefault(field, [])
+            if len(values) < MAX_REPORTED_VALUES and value not in values:
+                values.append(value)
+        if not changes:
+            continue
+
+        report["converted"] += 1
+        # updated_at so the next incremental backup carries the new shape
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {**changes, "updated_at": utc_now()}}))
+        if len(ops) >= batch_size:
+            flush(ops)
+            ops = []
+    flush(ops)
+    return report
+
+
+def backfill_warranty(collection, types_collection, apply=False):
+    """{type name: assets needing a new warranty_expiry} for every type with warranty_months."""
+    return {
+        doc["type_name"]: refresh_type_warranty(build_type_entry(doc), collection, apply=apply)
+        for doc in types_collection.find({"warranty_months": {"$gt": 0}})
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from models import assets_collection, asset_types_collection
+
+    apply = "--apply" in sys.argv
+    result = migrate_types(assets_collection, apply=apply)
+    print(f"ℹ️ {result['scanned']} asset(s) with string dates/amounts, {result['converted']} convertible.")
+    if apply:
+        print(f"✅ Converted {result['modified']} asset(s).")
+    else:
+        print("ℹ️ Dry run; re-run with --apply to write.")
+    for field, values in result["unparsed"].items():
+        print(f"⚠️ {field}: left as text: {', '.join(repr(v) for v in values)}")
+    if result["unparsed_count"]:
+        print(f"⚠️ {result['unparsed_count']} value(s) could not be parsed; fix them in the app and re-run.")
+    for type_name, count in backfill_warranty(assets_collection, asset_types_collection, apply=apply).items():
+        print(f"ℹ️ {type_name}: warranty expiry {'set' if apply else 'to set'} on {count} asset(s).")
@@ -1,11 +1,114 @@
 #models.py
+import os
+import threading
+
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
-client = MongoClient('mongodb://localhost:27017/')
-db = client['ams']
+from config import Config
+from instrumentation import event_listeners
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def client_options():
+    options = {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": Config.MONGO_MAX_IDLE_MS,
+        "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "readPreference": Config.MONGO_READ_PREFERENCE,
+        "appname": Config.MONGO_APP_NAME,
+    }
+    if Config.MONGO_SOCKET_TIMEOUT_MS:
+        options["socketTimeoutMS"] = Config.MONGO_SOCKET_TIMEOUT_MS
+    if Config.MONGO_COMPRESSORS:
+        options["compressors"] = Config.MONGO_COMPRESSORS
+    if event_listeners():
+        options["event_listeners"] = event_listeners()
+    return options
+
+
+def _create_client():
+    if Config.MONGO_URI.startswith("mongomock://"):
+        try:
+            import mongomock
+        except ImportError:
+            raise RuntimeError("MONGO_URI is mongomock:// but mongomock is not installed; run `pip install mongomock`.")
+        return mongomock.MongoClient()
+    # connect=False: no sockets or monitor threads until the first operation
+    return MongoClient(Config.MONGO_URI, connect=False, **client_options())
+
+
+def get_client():
+    """
+    The process's shared MongoClient, created on first use. A client must not
+    be used across fork(), so a forked worker (gunicorn) gets its own on first use.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _create_client()
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    return get_client()[Config.MONGO_DB_NAME]
+
+
+class _LazyProxy:
+    """Module-level stand-in that resolves against the current process's client on every use."""
+
+    def _target(self):
+        raise NotImplementedError
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+    def __getitem__(self, key):
+        return self._target()[key]
+
+    def __eq__(self, other):
+        target = other._target() if isinstance(other, _LazyProxy) else other
+        return self._target() == target
+
+    def __hash__(self):
+        return hash(self._target())
+
+
+class LazyDatabase(_LazyProxy):
+    def _target(self):
+        return get_db()
+
+    def __repr__(self):
+        return f"LazyDatabase({Config.MONGO_DB_NAME!r})"
+
+
+class LazyCollection(_LazyProxy):
+    def __init__(self, name):
+        self._name = name
+
+    def _target(self):
+        return get_db()[self._name]
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
+
 
-users_collection = db['users']
-assets_collection = db['assets']
-asset_types_collection = db['asset_types']
+# Importing these never connects; the client is built on first query
+db = LazyDatabase()
 
+users_collection = LazyCollection('users')
+assets_collection = LazyCollection('assets')
+asset_types_collection = LazyCollection('asset_types')
+export_jobs_collection = LazyCollection('export_jobs')
+locks_collection = LazyCollection('locks')
+backup_status_collection = LazyCollection('backup_status')
+asset_summary_collection = LazyCollection('asset_summary')
@@ -0,0 +1,110 @@
+#pagination.py
+import base64
+from datetime import datetime
+
+from bson import ObjectId, json_util
+
+# Only the columns the dashboard table renders
+DASHBOARD_PROJECTION = {
+    "category": 1, "model": 1, "system_model": 1, "username": 1,
+    "given_date": 1, "area": 1, "status": 1, "remarks": 1,
+}
+
+SORT_FIELDS = ["_id", "category", "given_date", "status"]
+PAGE_SIZES = [25, 50, 100, 200]
+DEFAULT_PAGE_SIZE = 50
+
+# BSON sort order across types (after null). $gt/$lt only match values of the
+# cursor value's own type, so a field mixing types (given_date holding dates
+# and legacy text) needs the later brackets matched by $type.
+_TYPE_ORDER = ("number", "string", "object", "binData", "objectId", "bool", "date")
+
+
+def encode_cursor(doc, sort_key):
+    """Opaque token pointing at a document's position in the sort order."""
+    raw = json_util.dumps([doc.get(sort_key), doc["_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        value, last_id = json_util.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        return value, last_id
+    except Exception:
+        return None
+
+
+def _after(sort_key, value, last_id, ascending):
+    """Query for documents strictly after (value, last_id) in the sort order."""
+    op = "$gt" if ascending else "$lt"
+    if sort_key == "_id":
+        return {"_id": {op: last_id}}
+
+    tie = {sort_key: value, "_id": {op: last_id}}
+    if value is None:
+        # Missing/null sorts lowest, so everything non-null comes after it ascending
+        if ascending:
+            return {"$or": [{sort_key: {"$ne": None}}, tie]}
+        return tie
+
+    clauses = [{sort_key: {op: value}}]
+    position = _TYPE_ORDER.index(_bson_type(value))
+    later_types = _TYPE_ORDER[position + 1:] if ascending else _TYPE_ORDER[:position]
+    clauses += [{sort_key: {"$type": t}} for t in later_types]
+    if not ascending:
+        # Descending: nulls come after every real value
+        clauses.append({sort_key: None})
+    clauses.append(tie)
+    return {"$or": clauses}
+
+
+def _bson_type(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, datetime):
+        return "date"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, bytes):
+        return "binData"
+    return "string"
+
+
+def fetch_page(collection, query=None, sort_key="_id", ascending=True,
+               page_size=DEFAULT_PAGE_SIZE, after=None, before=None, projection=None):
+    """
+    Keyset pagination over (sort_key, _id).
+    Returns (docs, next_cursor, prev_cursor); cursors are None at the ends.
+    """
+    query = dict(query or {})
+    token = after or before
+    position = decode_cursor(token) if token else None
+    backwards = bool(before) and position is not None
+
+    # Walking backwards is the same walk with the sort flipped
+    walk_ascending = ascending != backwards
+    if position is not None:
+        value, last_id = position
+        query = {"$and": [query, _after(sort_key, value, last_id, walk_ascending)]}
+
+    direction = 1 if walk_ascending else -1
+    sort = [("_id", direction)] if sort_key == "_id" else [(sort_key, direction), ("_id", direction)]
+
+    cursor = collection.find(query, projection).sort(sort).limit(page_size + 1)
+    docs = list(cursor)
+    has_more = len(docs) > page_size
+    docs = docs[:page_size]
+
+    if backwards:
+        docs.reverse()
+        next_cursor = encode_cursor(docs[-1], sort_key) if docs else None
+        prev_cursor = encode_cursor(docs[0], sort_key) if docs and has_more else None
+    else:
+        next_cursor = encode_cursor(docs[-1], sort_key) if docs and has_more else None
+        prev_cursor = encode_cursor(docs[0], sort_key) if docs and position is not None else None
+
+    return docs, next_cursor, prev_cursor
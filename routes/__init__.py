@@ -4,8 +4,10 @@ from flask import Blueprint
 from .auth import auth_bp
 from .main import main_bp
 from .export import export_bp
+from .api import api_bp
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(main_bp)
     app.register_blueprint(export_bp, url_prefix='/export')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
@@ -0,0 +1,341 @@
+from functools import wraps
+import hmac
+import re
+
+from flask import Blueprint, request, session, jsonify
+from flask_wtf.csrf import validate_csrf
+from wtforms.validators import ValidationError
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from extensions import csrf
+from models import assets_collection
+from pagination import fetch_page, SORT_FIELDS
+from search import resolve_asset_query, build_search_terms, build_date_range, parse_date_arg, FILTER_FIELDS, SEARCH_FIELDS
+from type_cache import type_cache
+from utils import build_asset_payload, build_partial_payload, utc_now
+from bulk_actions import bulk_update_assets
+from summary import mark_summary_stale
+from warranty import apply_warranty, expiring_query, WARRANTY_FIELDS
+
+api_bp = Blueprint('api', __name__)
+# API-key clients have no session to hold a CSRF token; session callers are checked in api_auth
+csrf.exempt(api_bp)
+
+_FIELD_RE = re.compile(r"^[A-Za-z0-9_]+$")
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def api_auth(view):
+    """Allow a valid X-API-Key, or a logged-in session (with its CSRF token on writes)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("X-API-Key", "")
+        if key:
+            if any(hmac.compare_digest(key, allowed) for allowed in Config.API_KEYS):
+                return view(*args, **kwargs)
+            return jsonify(error="Invalid API key"), 401
+
+        if 'user_id' not in session:
+            return jsonify(error="Unauthorized"), 401
+        if request.method in _WRITE_METHODS:
+            try:
+                validate_csrf(request.headers.get("X-CSRFToken"))
+            except ValidationError as e:
+                return jsonify(error=f"CSRF Error: {e}"), 400
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def serialize(doc):
+    """Asset document -> JSON-safe dict (string ids, ISO dates, no internal fields)."""
+    out = {}
+    for key, value in doc.items():
+        if key == "search_terms":
+            continue
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif hasattr(value, "isoformat"):
+            value = value.isoformat()
+        out[key] = value
+    return out
+
+
+def _projection(sort_key="_id"):
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+    if not fields:
+        return {"search_terms": 0}
+    bad = [f for f in fields if not _FIELD_RE.match(f) or f == "search_terms"]
+    if bad:
+        raise ValueError(f"Unknown fields: {', '.join(bad)}")
+    # The sort key has to come back for the page cursors to be built
+    return {f: 1 for f in fields + [sort_key]}
+
+
+def _conditional(payload):
+    """JSON response with an ETag; 304 when the client's If-None-Match still matches."""
+    response = jsonify(payload)
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _items(data):
+    """Bulk bodies are a list of assets, or {"items": [...]}."""
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("Body must be a non-empty list of assets (or {\"items\": [...]}).")
+    if len(items) > Config.API_MAX_BULK:
+        raise ValueError(f"At most {Config.API_MAX_BULK} assets per request.")
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError("Every item must be an object.")
+    return items
+
+
+def _object_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def _as_form_values(item):
+    # JSON numbers/nulls become the strings the form flow would have posted
+    return {k: "" if v is None else v if isinstance(v, str) else str(v) for k, v in item.items()}
+
+
+def _full_payload(item, current=None):
+    """Validated full payload for POST/PUT (`current`: the stored asset for PUT), or raise ValueError."""
+    category = item.get("category")
+    entry = type_cache.get(category)
+    if not entry:
+        raise ValueError(f"Unknown asset type: {category!r}")
+    unknown = set(item) - entry["allowed_fields"] - {"_id", "category"}
+    if unknown:
+        raise ValueError(f"Not fields of {category}: {', '.join(sorted(unknown))}")
+    return apply_warranty(build_asset_payload(_as_form_values(item), entry["field_names"], category), entry, current)
+
+
+def _existing(ids):
+    """One read for every asset a bulk PUT/PATCH touches: category, searchable and warranty fields."""
+    projection = {"category": 1, **{f: 1 for f in SEARCH_FIELDS}, **{f: 1 for f in WARRANTY_FIELDS}}
+    return {doc["_id"]: doc for doc in assets_collection.find({"_id": {"$in": ids}}, projection)}
+
+
+def _run_bulk(ops, index_of, errors):
+    """
+    Single unordered bulk_write; failed operations are reported against their
+    item index. Returns the server's counts (nInserted, nMatched, nModified).
+    """
+    if not ops:
+        return {}
+    try:
+        counts = assets_collection.bulk_write(ops, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            errors.append({"index": index_of[err["index"]], "error": err.get("errmsg", "write failed")})
+        counts = e.details
+    mark_summary_stale()
+    return counts
+
+
+def _bad_request(message):
+    return jsonify(error=message), 400
+
+
+# === Read ====================================================================
+@api_bp.route('/assets', methods=['GET'])
+@api_auth
+def list_assets():
+    sort_key = request.args.get('sort', '_id')
+    if sort_key not in SORT_FIELDS:
+        return _bad_request(f"sort must be one of {', '.join(SORT_FIELDS)}")
+    ascending = request.args.get('order', 'asc') != 'desc'
+    limit = min(max(request.args.get('limit', Config.API_PAGE_SIZE, type=int), 1), Config.API_MAX_PAGE_SIZE)
+    try:
+        projection = _projection(sort_key)
+        date_range = build_date_range(
+            request.args.get('date_field', ''),
+            request.args.get('date_from', '').strip(),
+            request.args.get('date_to', '').strip(),
+        )
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    filters = {f: request.args.get(f, '').strip() for f in FILTER_FIELDS}
+    query = resolve_asset_query(assets_collection, request.args.get('search', '').strip(), filters, date_range)
+    docs, next_cursor, prev_cursor = fetch_page(
+        assets_collection, query, sort_key, ascending, limit,
+        after=request.args.get('after') or None,
+        before=request.args.get('before') or None,
+        projection=projection,
+    )
+    return _conditional({
+        "items": [serialize(doc) for doc in docs],
+        "next": next_cursor,
+        "prev": prev_cursor,
+    })
+
+
+@api_bp.route('/assets/<asset_id>', methods=['GET'])
+@api_auth
+def get_asset(asset_id):
+    oid = _object_id(asset_id)
+    try:
+        projection = _projection()
+    except ValueError as e:
+        return _bad_request(str(e))
+    doc = assets_collection.find_one({"_id": oid}, projection) if oid else None
+    if not doc:
+        return jsonify(error="Asset not found"), 404
+    return _conditional(serialize(doc))
+
+
+# === Reports =================================================================
+@api_bp.route('/reports/warranty_expiring', methods=['GET'])
+@api_auth
+def warranty_expiring():
+    """Assets whose warranty ends within `days` (default 30) of today or `from`, soonest first."""
+    days = min(max(request.args.get('days', 30, type=int), 1), 3660)
+    limit = min(max(request.args.get('limit', Config.API_PAGE_SIZE, type=int), 1), Config.API_MAX_PAGE_SIZE)
+    try:
+        start = parse_date_arg(request.args['from']) if request.args.get('from') else None
+        projection = _projection("warranty_expiry")
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    # One range scan on (warranty_expiry, _id), which is also the page order
+    query = expiring_query(days, start, request.args.get('category', '').strip() or None)
+    docs, next_cursor, prev_cursor = fetch_page(
+        assets_collection, query, "warranty_expiry", True, limit,
+        after=request.args.get('after') or None,
+        before=request.args.get('before') or None,
+        projection=projection,
+    )
+    return _conditional({
+        "from": query["warranty_expiry"]["$gte"].date().isoformat(),
+        "days": days,
+        "items": [serialize(doc) for doc in docs],
+        "next": next_cursor,
+        "prev": prev_cursor,
+    })
+
+
+# === Bulk write ==============================================================
+@api_bp.route('/assets', methods=['POST'])
+@api_auth
+def create_assets():
+    try:
+        items = _items(request.get_json(silent=True))
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    ops, index_of, ids, errors = [], [], [], []
+    now = utc_now()
+    for index, item in enumerate(items):
+        try:
+            payload = _full_payload(item)
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+            continue
+        payload["_id"] = ObjectId()
+        payload["search_terms"] = build_search_terms(payload)
+        payload["updated_at"] = now
+        ops.append(InsertOne(payload))
+        index_of.append(index)
+        ids.append(payload["_id"])
+
+    counts = _run_bulk(ops, index_of, errors)
+    failed = {e["index"] for e in errors}
+    return jsonify(
+        inserted=counts.get("nInserted", 0),
+        ids=[str(i) for idx, i in zip(index_of, ids) if idx not in failed],
+        errors=sorted(errors, key=lambda e: e["index"]),
+    ), 201 if ops else 400
+
+
+def _update_assets(partial):
+    try:
+        items = _items(request.get_json(silent=True))
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    ids = [_object_id(item.get("_id")) for item in items]
+    existing = _existing([i for i in ids if i])
+
+    ops, index_of, errors = [], [], []
+    now = utc_now()
+    for index, (item, oid) in enumerate(zip(items, ids)):
+        current = existing.get(oid) if oid else None
+        if not current:
+            errors.append({"index": index, "error": "Asset not found" if oid else "Missing or invalid _id"})
+            continue
+
+        fields = {k: v for k, v in item.items() if k != "_id"}
+        try:
+            if partial:
+                entry = type_cache.get(current.get("category"))
+                if not entry:
+                    raise ValueError(f"Unknown asset type: {current.get('category')!r}")
+                payload, unknown = build_partial_payload(fields, entry["allowed_fields"])
+                if unknown:
+                    raise ValueError(f"Not fields of {entry['type_name']}: {', '.join(sorted(unknown))}")
+                if not payload:
+                    raise ValueError("No fields to update")
+                apply_warranty(payload, entry, current)
+            else:
+                fields.setdefault("category", current.get("category"))
+                payload = _full_payload(fields, current)
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+            continue
+
+        payload["search_terms"] = build_search_terms({**current, **payload})
+        payload["updated_at"] = now
+        ops.append(UpdateOne({"_id": oid}, {"$set": payload}))
+        index_of.append(index)
+
+    counts = _run_bulk(ops, index_of, errors)
+    return jsonify(
+        matched=counts.get("nMatched", 0),
+        modified=counts.get("nModified", 0),
+        errors=sorted(errors, key=lambda e: e["index"]),
+    ), 200 if ops else 400
+
+
+@api_bp.route('/assets', methods=['PUT'])
+@api_auth
+def replace_assets():
+    """Full update: every field of the asset's type is rewritten (missing ones become empty)."""
+    return _update_assets(partial=False)
+
+
+@api_bp.route('/assets', methods=['PATCH'])
+@api_auth
+def patch_assets():
+    """Partial update: only the given fields are $set."""
+    return _update_assets(partial=True)
+
+
+@api_bp.route('/assets/bulk_update', methods=['POST'])
+@api_auth
+def bulk_update():
+    """Same partial $set on many assets: {"ids": [...], "set": {"status": "assigned", ...}}."""
+    data = request.get_json(silent=True) or {}
+    changes = data.get("set")
+    raw_ids = data.get("ids")
+    if not isinstance(changes, dict) or not changes:
+        return _bad_request('"set" must be a non-empty object of field values.')
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return _bad_request('"ids" must be a non-empty list.')
+    if len(raw_ids) > Config.API_MAX_BULK:
+        return _bad_request(f"At most {Config.API_MAX_BULK} assets per request.")
+
+    ids = [_object_id(i) for i in raw_ids]
+    if None in ids:
+        return _bad_request("Every id must be a valid ObjectId.")
+    return jsonify(bulk_update_assets(ids, changes))
@@ -3,6 +3,9 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from forms import LoginForm
 from extensions import csrf
 from models import users_collection
+from indexes import USERNAME_COLLATION
+from utils import utc_now
+from bson.objectid import ObjectId
 import sys
 
 auth_bp = Blueprint('auth', __name__)
@@ -15,7 +18,8 @@ def login():
         identifier = request.form['identifier'].strip().lower()
         password = request.form['passcode']
 
-        user = users_collection.find_one({'username': {'$regex': f'^{identifier}$', '$options': 'i'}})
+        # Exact match under the case-insensitive collation of the username index
+        user = users_collection.find_one({'username': identifier}, collation=USERNAME_COLLATION)
 
         if user and check_password_hash(user['password'], password):
             session['user_id'] = str(user['_id'])
@@ -53,8 +57,10 @@ def api_change_password():
     if not current_pw or not new_pw or not confirm_pw:
         return jsonify(error="All fields are required."), 400
 
-    username = session['username']
-    user = users_collection.find_one({'username': {'$regex': f'^{username}$', '$options': 'i'}})
+    if session.get('user_id'):
+        user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
+    else:
+        user = users_collection.find_one({'username': session['username']}, collation=USERNAME_COLLATION)
 
     if not user or not check_password_hash(user["password"], current_pw):
         return jsonify(error="Current password is incorrect."), 400
@@ -63,7 +69,7 @@ def api_change_password():
         return jsonify(error="New passwords do not match."), 400
 
     hashed = generate_password_hash(new_pw)
-    users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": hashed}})
+    users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": hashed, "updated_at": utc_now()}})
     return jsonify(message="Password updated successfully."), 200
 
 
@@ -1,23 +1,25 @@
+import logging
+
 from flask import Blueprint, request, render_template, session, redirect, url_for, flash, jsonify, send_from_directory
 from bson.objectid import ObjectId
-from datetime import datetime
 from models import assets_collection, asset_types_collection
 from forms import AssetForm
-from utils import normalize_asset_data, get_master_fields, get_indian_states
-from utils import get_all_existing_types 
+from utils import get_master_fields, get_indian_states
+from utils import build_asset_payload, form_values, utc_now
+from pagination import fetch_page, DASHBOARD_PROJECTION, SORT_FIELDS, PAGE_SIZES, DEFAULT_PAGE_SIZE
+from search import resolve_asset_query, build_search_terms, build_date_range, FILTER_FIELDS
+from type_cache import type_cache, field_list_error, STORED_STATUSES
+from bulk_actions import bulk_update_assets, BULK_FIELDS
+from summary import get_summary, mark_summary_stale
+from warranty import apply_warranty, parse_warranty_months, refresh_type_warranty
 
 #from utils import normalize_asset_data, fill_missing_asset_fields, get_master_fields, get_indian_states, filter_form_fields
 #from bson import json_util
 #import json
 
 main_bp = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
 
-def parse_ddmmyyyy_to_date(val):
-    try:
-        return datetime.strptime(val.strip(), "%d-%m-%Y") if val else None
-    except Exception:
-        return None
-    
 @main_bp.route('/assets/<path:filename>')
 def serve_assets(filename):
     return send_from_directory('public/assets', filename)
@@ -31,8 +33,89 @@ def landing():
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
-    assets = list(assets_collection.find())
-    return render_template('dashboard.html', assets=assets)
+
+    sort_key = request.args.get('sort', '_id')
+    if sort_key not in SORT_FIELDS:
+        sort_key = '_id'
+    ascending = request.args.get('order', 'asc') != 'desc'
+    page_size = request.args.get('size', DEFAULT_PAGE_SIZE, type=int)
+    if page_size not in PAGE_SIZES:
+        page_size = DEFAULT_PAGE_SIZE
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    search = request.args.get('search', '').strip()
+    filters = {f: request.args.get(f, '').strip() for f in FILTER_FIELDS}
+    dates = {k: request.args.get(k, '').strip() for k in ('date_field', 'date_from', 'date_to')}
+    try:
+        date_range = build_date_range(dates['date_field'], dates['date_from'], dates['date_to'])
+    except ValueError as e:
+        flash(f"⚠️ Date filter ignored: {e}", "warning")
+        date_range = {}
+        dates = {'date_field': dates['date_field']}
+    query = resolve_asset_query(assets_collection, search, filters, date_range)
+
+    assets, next_cursor, prev_cursor = fetch_page(
+        assets_collection,
+        query=query,
+        sort_key=sort_key,
+        ascending=ascending,
+        page_size=page_size,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        projection=DASHBOARD_PROJECTION,
+    )
+
+    page_args = {'sort': sort_key, 'order': 'asc' if ascending else 'desc', 'size': page_size, 'search': search}
+    page_args.update({f: v for f, v in filters.items() if v})
+    page_args.update({k: v for k, v in dates.items() if v})
+    return render_template(
+        'dashboard.html',
+        assets=assets,
+        offset=offset,
+        page_args=page_args,
+        page_sizes=PAGE_SIZES,
+        filter_options={
+            'category': type_cache.type_names(),
+            'status': STORED_STATUSES,
+            'state': get_indian_states(),
+        },
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    )
+
+@main_bp.route('/summary')
+def summary():
+    if 'user_id' not in session:
+        return jsonify(error="Unauthorized"), 401
+    doc = get_summary()
+    return jsonify(computed_at=doc["computed_at"].isoformat(), stale=doc.get("stale", False), **doc["data"])
+
+@main_bp.route('/bulk_update', methods=['POST'])
+def bulk_update():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    # Only go back to a page of this app
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for('main.dashboard')
+
+    ids = []
+    for asset_id in request.form.getlist('asset_ids'):
+        try:
+            ids.append(ObjectId(asset_id))
+        except Exception:
+            continue
+    changes = {f: request.form.get(f, '').strip() for f in BULK_FIELDS if request.form.get(f, '').strip()}
+    if not ids or not changes:
+        flash("Select at least one asset and fill in at least one field.", "warning")
+        return redirect(next_url)
+
+    result = bulk_update_assets(ids, changes)
+    flash(f"✅ Updated {result['modified']} of {len(ids)} selected asset(s).", "success")
+    for category, reason in result['skipped'].items():
+        flash(f"⚠️ Skipped {category}: {reason}.", "warning")
+    return redirect(next_url)
 
 @main_bp.route("/create_type", methods=["POST"])
 def create_type():
@@ -40,45 +123,66 @@ def create_type():
     type_name = data.get("type")
     fields = data.get("fields", [])
 
-    if not type_name or not fields:
+    if not type_name:
         return jsonify(success=False, message="Type name and fields are required."), 400
+    error = field_list_error(fields)
+    if error:
+        return jsonify(success=False, message=error), 400
+    try:
+        warranty_months = parse_warranty_months(data.get("warranty_months"))
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
 
     if asset_types_collection.find_one({"type_name": type_name}):
         return jsonify(success=False, message="Type already exists."), 409
 
     asset_types_collection.insert_one({
         "type_name": type_name,
-        "fields": fields
+        "fields": fields,
+        "warranty_months": warranty_months,
+        "updated_at": utc_now()
     })
+    type_cache.invalidate(type_name)
 
     return jsonify(success=True, message="Type created successfully.")
 
+@main_bp.route("/asset_types/<type_name>/warranty", methods=["POST"])
+def set_type_warranty(type_name):
+    """{"warranty_months": 36} (or null to stop tracking); recomputes the type's warranty_expiry dates."""
+    if 'user_id' not in session:
+        return jsonify(error="Unauthorized"), 401
+    try:
+        warranty_months = parse_warranty_months((request.get_json(silent=True) or {}).get("warranty_months"))
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
+
+    result = asset_types_collection.update_one(
+        {"type_name": type_name},
+        {"$set": {"warranty_months": warranty_months, "updated_at": utc_now()}},
+    )
+    if not result.matched_count:
+        return jsonify(success=False, message="Asset type not found."), 404
+    type_cache.invalidate(type_name)
+
+    updated = refresh_type_warranty(type_cache.get(type_name), assets_collection)
+    return jsonify(success=True, warranty_months=warranty_months, assets_updated=updated)
+
 @main_bp.route('/get_asset_types')
 def get_asset_types():
-    types = asset_types_collection.find({}, {"_id": 0, "type_name": 1})
-    return jsonify([doc["type_name"] for doc in types])
+    return jsonify(type_cache.type_names())
 
 @main_bp.route('/get_fields/<asset_type>')
 def get_fields(asset_type):
-    config = asset_types_collection.find_one({'type_name': asset_type})
-    if config and 'fields' in config:
-        fields = config["fields"]
-
-        status_options = ["Available", "Assigned", "Repair/Faulty", "Discard"]
-
-        for field in fields:
-            if field.get("name", "").lower() == "state" and field.get("type") == "select":
-                if not field.get("options"):
-                    field["options"] = get_indian_states()
-
-            if field.get("name", "").lower() == "status" and field.get("type") == "select":
-                if not field.get("options"):
-                    field["options"] = status_options
+    entry = type_cache.get(asset_type)
+    # ✅ Always return fields key to avoid frontend error
+    return jsonify({"fields": entry["fields"] if entry else []})
 
-        return jsonify({"fields": fields})
 
-    # ✅ Always return fields key to avoid frontend error
-    return jsonify({"fields": []})
+@main_bp.route("/type_cache_stats")
+def type_cache_stats():
+    if 'user_id' not in session:
+        return jsonify(error="Unauthorized"), 401
+    return jsonify(type_cache.stats())
 
 
 @main_bp.route("/get_master_fields")
@@ -121,69 +225,44 @@ def create_asset():
 
             # Combine field list
             master_fields = get_master_fields()
-            print("📦 master_fields available:", [f["name"] for f in master_fields])
+            logger.debug("master_fields available: %s", [f["name"] for f in master_fields])
             full_predefined = [f for f in master_fields if f["name"] in predefined_fields]
             new_type_fields = full_predefined + custom_fields
 
-            print("🧪 new_type_fields about to be saved:", new_type_fields)
+            logger.debug("new_type_fields about to be saved: %s", new_type_fields)
 
             # Save the new type to DB
             asset_types_collection.update_one(
                 {"type_name": new_type},
-                {"$set": {"fields": new_type_fields}},
+                {"$set": {"fields": new_type_fields, "updated_at": utc_now()}},
                 upsert=True
             )
+            type_cache.invalidate(new_type)
 
         # ✅ Fetch config AFTER type is saved
         if is_new_type:
-            fields_to_render = new_type_fields
+            selected_config = None
+            field_names = [f["name"] for f in new_type_fields]
         else:
-            selected_config = asset_types_collection.find_one({"type_name": selected_type})
-            fields_to_render = selected_config["fields"] if selected_config else []
-
-        allowed_fields = [f["name"] for f in fields_to_render]
-
+            selected_config = type_cache.get(selected_type)
+            field_names = selected_config["field_names"] if selected_config else []
 
-        for field in ["given_date", "purchase_date", "collected_date", "prev_given_date"]:
-            date_str = raw_data.get(field, "")
-            parsed_date = parse_ddmmyyyy_to_date(date_str.strip()) if date_str.strip() else None
-            if parsed_date:
-                raw_data[field] = parsed_date.strftime("%d-%m-%Y")
-            else:
-                raw_data[field] = date_str
+        logger.debug("allowed_fields: %s", field_names)
 
-        for money_field in ["amount", "total"]:
-            if raw_data.get(money_field):
-                raw_data[money_field] = raw_data[money_field].replace("₹", "").replace(",", "")
+        payload = apply_warranty(build_asset_payload(raw_data, field_names, selected_type), selected_config)
+        payload["search_terms"] = build_search_terms(payload)
+        payload["updated_at"] = utc_now()
 
-        normalized = normalize_asset_data(raw_data)
-        raw_data.update(normalized)
-
-        print("⚙️ raw_data keys:", raw_data.keys())
-        print("⚙️ allowed_fields:", allowed_fields)
-
-        payload = {
-            k: (v if isinstance(v, str) else v.strftime("%d-%m-%Y") if isinstance(v, datetime) else "")
-            for k, v in raw_data.items()
-            if k in allowed_fields
-        }
-
-        # Ensure all allowed fields are present, even if empty
-        for field_name in allowed_fields:
-            payload.setdefault(field_name, "")
-
-        payload["category"] = selected_type
-
-        print("➡️ Payload to insert:", payload)
+        logger.debug("Payload to insert: %s", payload)
 
         assets_collection.insert_one(payload)
+        mark_summary_stale()
 
         flash("Asset added successfully.", "success")
         return redirect(url_for("main.dashboard"))
 
     # GET route: Populate dropdown and form
-    types = asset_types_collection.find({}, {"type_name": 1})
-    form.category.choices = [(t["type_name"], t["type_name"]) for t in types]
+    form.category.choices = [(t, t) for t in type_cache.type_names()]
     form.category.choices.append(("add_new_type", "add_new_type"))
 
     selected_type = request.args.get("type")
@@ -196,8 +275,8 @@ def create_asset():
                 if not field.get("options"):
                     field["options"] = get_indian_states()
     elif selected_type:
-        config = asset_types_collection.find_one({"type_name": selected_type})
-        if config and "fields" in config:
+        config = type_cache.get(selected_type)
+        if config:
             fields_to_render = config["fields"]
 
     return render_template(
@@ -217,9 +296,9 @@ def edit_asset(asset_id):
         return redirect(url_for("main.dashboard"))
 
     selected_type = asset.get("category")
-    config = asset_types_collection.find_one({"type_name": selected_type})
+    config = type_cache.get(selected_type)
     fields_to_render = config["fields"] if config else []
-    allowed_fields = [f["name"] for f in fields_to_render]
+    field_names = config["field_names"] if config else []
 
     form = AssetForm(data=asset)
 
@@ -228,47 +307,25 @@ def edit_asset(asset_id):
         raw_data.pop("csrf_token", None)
         raw_data.pop("submit", None)
 
-        for field in ["given_date", "purchase_date", "collected_date", "prev_given_date"]:
-            date_str = raw_data.get(field, "")
-            parsed_date = parse_ddmmyyyy_to_date(date_str.strip()) if date_str.strip() else None
-            if parsed_date:
-                raw_data[field] = parsed_date.strftime("%d-%m-%Y")
-            else:
-                raw_data[field] = date_str
-
-        for money_field in ["amount", "total"]:
-            if raw_data.get(money_field):
-                raw_data[money_field] = raw_data[money_field].replace("₹", "").replace(",", "")
-
-        normalized = normalize_asset_data(raw_data)
-        raw_data.update(normalized)
-
-        payload = {
-            k: (v if isinstance(v, str) else v.strftime("%d-%m-%Y") if isinstance(v, datetime) else "")
-            for k, v in raw_data.items()
-            if k in allowed_fields
-        }
-
-        for key in allowed_fields:
-            payload.setdefault(key, "")
-
-        payload["category"] = selected_type
+        payload = apply_warranty(build_asset_payload(raw_data, field_names, selected_type), config, asset)
+        payload["search_terms"] = build_search_terms({**asset, **payload})
+        payload["updated_at"] = utc_now()
 
         assets_collection.update_one({"_id": ObjectId(asset_id)}, {"$set": payload})
+        mark_summary_stale()
 
         flash("Asset updated successfully.", "success")
         return redirect(url_for("main.dashboard"))
 
-    asset["_id"] = str(asset["_id"]) 
     return render_template(
         "create_new_asset.html",
         form=form,
         editing=True,
         master_fields=get_master_fields(),
-        asset_data=asset,
+        asset_data=form_values(asset),
         asset_id=asset_id,
         fields_to_render=fields_to_render,
-        types=get_all_existing_types()
+        types=type_cache.type_names()
 
     )
 
@@ -283,9 +340,9 @@ def view_asset(asset_id):
     asset_type = asset.get("category")
     fields_config = []
 
-    config = asset_types_collection.find_one({"type_name": asset_type})
+    config = type_cache.get(asset_type)
     if config:
-        fields_config = config.get("fields", [])
+        fields_config = config["fields"]
 
     view_data = []
     for field in fields_config:
@@ -0,0 +1,272 @@
+#scheduler.py
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import Config
+from models import locks_collection, backup_status_collection
+from utils import utc_now
+
+logger = logging.getLogger(__name__)
+
+# One lease for every kind of backup: full and incremental never overlap
+LEASE_NAME = "backup"
+BACKUP_KINDS = ("full", "incremental")
+
+_TOKEN = uuid.uuid4().hex[:8]
+_pool = None
+_pool_lock = threading.Lock()
+_started_pid = None
+_start_lock = threading.Lock()
+
+
+def _owner():
+    # Includes the pid so forked workers never share an identity
+    return f"{socket.gethostname()}:{os.getpid()}:{_TOKEN}"
+
+
+def _as_utc(dt):
+    # pymongo hands dates back naive (but in UTC) unless the client is tz_aware
+    return dt.replace(tzinfo=timezone.utc) if dt and dt.tzinfo is None else dt
+
+
+# === Lease lock ==============================================================
+def acquire_lease(name, owner, seconds):
+    """
+    Take (or renew) the lease `name` for `seconds`. Succeeds when nobody holds
+    it, the holder's lease has expired, or `owner` already holds it.
+    """
+    now = utc_now()
+    try:
+        doc = locks_collection.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False  # the lock exists and is held by someone else
+    return doc["owner"] == owner
+
+
+def release_lease(name, owner):
+    locks_collection.delete_one({"_id": name, "owner": owner})
+
+
+def lease_holder(name):
+    """Owner of an unexpired lease, or None."""
+    doc = locks_collection.find_one({"_id": name, "expires_at": {"$gt": utc_now()}})
+    return doc["owner"] if doc else None
+
+
+# === Backup worker ===========================================================
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: a fresh interpreter with its own MongoClient, never a forked copy
+            _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _run_backup(kind):
+    """Runs in the worker process: take the backup, then apply retention."""
+    from backup import create_backup, create_incremental_backup, prune_backups
+    from models import db
+
+    manifest = create_incremental_backup(db) if kind == "incremental" else create_backup(db)
+    return {
+        "name": manifest["name"],
+        "path": manifest["path"],
+        "kind": manifest["kind"],
+        "bytes": manifest["bytes"],
+        "documents": sum(c["documents"] for c in manifest["collections"].values()),
+        "pruned": prune_backups(),
+    }
+
+
+def _run_leased(status_id, fn, *args, still_wanted=None):
+    """
+    Run fn(*args) in the worker process if this process wins the lease,
+    renewing it while the work runs, and record the outcome in backup_status
+    under `status_id`. Returns the recorded status, or None when another
+    process holds the lease or `still_wanted()` says the work is no longer needed.
+    """
+    owner = _owner()
+    if not acquire_lease(LEASE_NAME, owner, Config.BACKUP_LEASE_SECONDS):
+        return None
+    # Another process may have finished the same run between our check and the lease
+    if still_wanted and not still_wanted():
+        release_lease(LEASE_NAME, owner)
+        return None
+
+    started = utc_now()
+    backup_status_collection.update_one(
+        {"_id": status_id}, {"$set": {"running": True, "owner": owner, "started_at": started}}, upsert=True
+    )
+    try:
+        future = _get_pool().submit(fn, *args)
+        while True:
+            try:
+                result = future.result(timeout=Config.BACKUP_LEASE_SECONDS / 3)
+                break
+            except FutureTimeout:
+                acquire_lease(LEASE_NAME, owner, Config.BACKUP_LEASE_SECONDS)
+        status = {"ok": True, "error": None, **result}
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _reset_pool()
+        logger.exception("Backup worker job %r failed", status_id)
+        status = {"ok": False, "error": str(e)}
+
+    finished = utc_now()
+    status.update(running=False, finished_at=finished, duration_seconds=(finished - started).total_seconds())
+    if status["ok"]:
+        status["last_success_at"] = finished
+    backup_status_collection.update_one({"_id": status_id}, {"$set": status}, upsert=True)
+    release_lease(LEASE_NAME, owner)
+    return status
+
+
+def run_backup(kind, only_if_due=False):
+    """
+    Take a `kind` backup under the lease; the recorded status, or None if the
+    lease is held (or, with `only_if_due`, the backup is no longer due once it's ours).
+    """
+    still_wanted = (lambda: due_kind() == kind) if only_if_due else None
+    return _run_leased(kind, _run_backup, kind, still_wanted=still_wanted)
+
+
+def trigger_backup(kind):
+    """Start a backup in the background. False if one is already running somewhere."""
+    if kind not in BACKUP_KINDS:
+        raise ValueError(f"Unknown backup kind: {kind}")
+    if lease_holder(LEASE_NAME):
+        return False
+    threading.Thread(target=run_backup, args=(kind,), name=f"backup-{kind}", daemon=True).start()
+    return True
+
+
+# === Restore ================================================================
+def _run_restore(name, path, collections):
+    """Runs in the worker process: restore the chain ending at `path`."""
+    from backup import restore_backup
+    from models import db
+
+    restored = restore_backup(db, path, collections=collections)
+    return {"name": name, "collections": restored, "documents": sum(restored.values())}
+
+
+def run_restore(name, path, collections=None):
+    """
+    Restore a backup in the worker process under the backup lease, so no
+    backup snapshots a half-restored database. Returns the recorded status,
+    or None when a backup or restore holds the lease.
+    """
+    status = _run_leased("restore", _run_restore, name, path, collections)
+    if status and status["ok"]:
+        from summary import mark_summary_stale
+        from type_cache import type_cache
+
+        type_cache.invalidate()
+        mark_summary_stale()
+    return status
+
+
+def trigger_restore(name, path, collections=None):
+    """Start a restore in the background. False if a backup or restore is already running."""
+    if lease_holder(LEASE_NAME):
+        return False
+    threading.Thread(target=run_restore, args=(name, path, collections), name="restore", daemon=True).start()
+    return True
+
+
+# === Schedule ================================================================
+def _interval(kind):
+    hours = Config.BACKUP_FULL_INTERVAL_HOURS if kind == "full" else Config.BACKUP_INCREMENTAL_INTERVAL_HOURS
+    return timedelta(hours=hours)
+
+
+def due_kind(now=None):
+    """
+    The backup kind that is due cluster-wide, or None. Full backups win;
+    an increment is due once neither kind has succeeded within its interval.
+    Failed attempts are retried after BACKUP_LEASE_SECONDS rather than every poll.
+    """
+    now = now or utc_now()
+    statuses = {doc["_id"]: doc for doc in backup_status_collection.find({"_id": {"$in": list(BACKUP_KINDS)}})}
+    kinds = ["full", "incremental"] if Config.BACKUP_INCREMENTAL_ENABLED else ["full"]
+
+    for kind in kinds:
+        status = statuses.get(kind, {})
+        if status.get("ok") is False and status.get("finished_at"):
+            if now - _as_utc(status["finished_at"]) < timedelta(seconds=Config.BACKUP_LEASE_SECONDS):
+                continue
+        # A full backup also resets the incremental clock
+        relevant = ("full",) if kind == "full" else BACKUP_KINDS
+        successes = [statuses.get(k, {}).get("last_success_at") for k in relevant]
+        last = max((_as_utc(s) for s in successes if s), default=None)
+        if last is None or now - last >= _interval(kind):
+            return kind
+    return None
+
+
+def _loop():
+    while True:
+        try:
+            kind = due_kind()
+            if kind:
+                run_backup(kind, only_if_due=True)
+        except Exception:
+            logger.exception("Backup scheduler tick failed")
+        time.sleep(Config.BACKUP_POLL_SECONDS)
+
+
+def start_backup_scheduler():
+    """Start this process's scheduler thread; repeated calls in the same process are no-ops."""
+    global _started_pid
+    with _start_lock:
+        if _started_pid == os.getpid():
+            return False
+        _started_pid = os.getpid()
+    threading.Thread(target=_loop, name="backup-scheduler", daemon=True).start()
+    return True
+
+
+def backup_status():
+    """Last run of each backup kind and of restore, plus the current lease holder, JSON friendly."""
+    def clean(doc):
+        doc = dict(doc)
+        doc.pop("_id", None)
+        for key, value in doc.items():
+            if hasattr(value, "isoformat"):
+                doc[key] = _as_utc(value).isoformat()
+        return doc
+
+    ids = list(BACKUP_KINDS) + ["restore"]
+    statuses = {doc["_id"]: clean(doc) for doc in backup_status_collection.find({"_id": {"$in": ids}})}
+    return {
+        "running": lease_holder(LEASE_NAME),
+        "due": due_kind(),
+        "full": statuses.get("full"),
+        "incremental": statuses.get("incremental"),
+        "restore": statuses.get("restore"),
+    }
@@ -0,0 +1,128 @@
+#search.py
+import re
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+# Fields the dashboard search box matches against
+SEARCH_FIELDS = ["username", "model", "system_model", "serial_no", "asset_tag", "area", "status", "category"]
+
+# Exact-match facet filters offered next to the search box
+FILTER_FIELDS = ["category", "status", "state"]
+
+# Indexed date fields offered as a from/to range filter
+DATE_RANGE_FIELDS = ["purchase_date", "given_date", "collected_date", "warranty_expiry"]
+
+TEXT_INDEX_NAME = "asset_search_text"
+
+_TOKEN_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def tokenize(value):
+    return [t for t in _TOKEN_RE.split(str(value).lower()) if t]
+
+
+def build_search_terms(doc):
+    """
+    Lowercased whole values plus their individual words, stored on each asset
+    so an anchored prefix regex can walk the multikey index.
+    """
+    terms = set()
+    for field in SEARCH_FIELDS:
+        value = doc.get(field)
+        if not value or not isinstance(value, str):
+            continue
+        whole = value.strip().lower()
+        if whole:
+            terms.add(whole)
+        terms.update(tokenize(whole))
+    return sorted(terms)
+
+
+def parse_date_arg(value):
+    """dd-mm-yyyy (as typed) or yyyy-mm-dd (<input type=date>, API) -> datetime; raises ValueError."""
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"'{value}' is not a date (dd-mm-yyyy or yyyy-mm-dd)")
+
+
+def build_date_range(field, date_from="", date_to=""):
+    """
+    {field: {"$gte": from, "$lt": day after to}} with both ends inclusive, or {}
+    when neither end is given. Raises ValueError on an unknown field or bad date.
+    """
+    if not date_from and not date_to:
+        return {}
+    if field not in DATE_RANGE_FIELDS:
+        raise ValueError(f"date_field must be one of {', '.join(DATE_RANGE_FIELDS)}")
+    bounds = {}
+    if date_from:
+        bounds["$gte"] = parse_date_arg(date_from)
+    if date_to:
+        bounds["$lt"] = parse_date_arg(date_to) + timedelta(days=1)
+    return {field: bounds}
+
+
+def build_asset_query(search="", filters=None, date_range=None):
+    """Prefix query on search_terms combined with exact facet filters and a date range."""
+    query = dict(date_range or {})
+    for field, value in (filters or {}).items():
+        if field in FILTER_FIELDS and value:
+            query[field] = value
+
+    tokens = tokenize(search)
+    if tokens:
+        query["$and"] = [{"search_terms": {"$regex": f"^{re.escape(t)}"}} for t in tokens]
+    return query
+
+
+def build_text_query(search="", filters=None, date_range=None):
+    """Word/stemmed match through the text index, used when prefixes find nothing."""
+    query = {f: v for f, v in (filters or {}).items() if f in FILTER_FIELDS and v}
+    query.update(date_range or {})
+    if search.strip():
+        query["$text"] = {"$search": search.strip()}
+    return query
+
+
+def resolve_asset_query(collection, search="", filters=None, date_range=None):
+    query = build_asset_query(search, filters, date_range)
+    if search.strip() and not collection.find_one(query, {"_id": 1}):
+        text_query = build_text_query(search, filters, date_range)
+        try:
+            if collection.find_one(text_query, {"_id": 1}):
+                return text_query
+        except (OperationFailure, NotImplementedError):
+            # No text index until init_db.py (or ENSURE_INDEXES_ON_STARTUP) builds it, and
+            # mongomock has no $text at all; the prefix query's empty result stands
+            pass
+    return query
+
+
+def backfill_search_terms(collection, batch_size=1000):
+    """Populate search_terms on assets written before search existed."""
+    projection = {f: 1 for f in SEARCH_FIELDS}
+    ops = []
+    updated = 0
+    for doc in collection.find({"search_terms": {"$exists": False}}, projection).batch_size(batch_size):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_terms": build_search_terms(doc)}}))
+        if len(ops) >= batch_size:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+def refresh_search_terms(collection, ids, batch_size=1000):
+    """Recompute search_terms for specific assets after partial updates."""
+    ops = [
+        UpdateOne({"_id": doc["_id"]}, {"$set": {"search_terms": build_search_terms(doc)}})
+        for doc in collection.find({"_id": {"$in": list(ids)}}, {f: 1 for f in SEARCH_FIELDS}).batch_size(batch_size)
+    ]
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    return len(ops)
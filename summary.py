@@ -0,0 +1,143 @@
+#summary.py
+import threading
+from datetime import timedelta, timezone
+
+from config import Config
+from models import assets_collection, asset_summary_collection
+from utils import to_stored_money, utc_now
+
+SUMMARY_ID = "assets"
+
+
+def _money(field):
+    # Amounts are stored as numbers; rows not yet run through migrate_types.py may
+    # still hold "1234.50" strings. Blanks and junk count as 0
+    return {"$convert": {"input": f"${field}", "to": "double", "onError": 0, "onNull": 0}}
+
+
+def _group(key, with_money=False):
+    group = {"_id": f"${key}" if key else None, "count": {"$sum": 1}}
+    if with_money:
+        group.update(amount={"$sum": _money("amount")}, total={"$sum": _money("total")})
+    return [{"$group": group}, {"$sort": {"count": -1, "_id": 1}}]
+
+
+# One pass over the collection for every breakdown the panel shows
+SUMMARY_PIPELINE = [
+    {"$project": {"category": 1, "status": 1, "state": 1, "amount": 1, "total": 1}},
+    {"$facet": {
+        "totals": _group(None, with_money=True),
+        "by_category": _group("category", with_money=True),
+        "by_status": _group("status"),
+        "by_state": _group("state"),
+    }},
+]
+
+_refresh_lock = threading.Lock()
+
+
+def _shape(facets):
+    def rows(name):
+        return [
+            {"key": row["_id"] or "—", **{k: v for k, v in row.items() if k != "_id"}}
+            for row in facets.get(name, [])
+        ]
+
+    totals = facets.get("totals") or [{}]
+    return {
+        "totals": {
+            "count": totals[0].get("count", 0),
+            "amount": totals[0].get("amount", 0),
+            "total": totals[0].get("total", 0),
+        },
+        "by_category": rows("by_category"),
+        "by_status": rows("by_status"),
+        "by_state": rows("by_state"),
+    }
+
+
+def _facets_in_python(collection):
+    """SUMMARY_PIPELINE's output computed client-side, for mongomock (no $convert)."""
+    def money(value):
+        amount = to_stored_money(value)
+        return amount if isinstance(amount, float) else 0
+
+    groups = {"totals": {}, "by_category": {}, "by_status": {}, "by_state": {}}
+    for doc in collection.find({}, SUMMARY_PIPELINE[0]["$project"]):
+        for name, key in (("totals", None), ("by_category", "category"), ("by_status", "status"), ("by_state", "state")):
+            row = groups[name].setdefault(doc.get(key) if key else None, {"count": 0, "amount": 0, "total": 0})
+            row["count"] += 1
+            row["amount"] += money(doc.get("amount"))
+            row["total"] += money(doc.get("total"))
+
+    facets = {}
+    for name, rows in groups.items():
+        with_money = name in ("totals", "by_category")
+        facets[name] = sorted(
+            ({"_id": key, **(row if with_money else {"count": row["count"]})} for key, row in rows.items()),
+            key=lambda row: (-row["count"], str(row["_id"] or "")),
+        )
+    return facets
+
+
+def compute_summary(collection=assets_collection):
+    if Config.MONGO_URI.startswith("mongomock://"):
+        return _shape(_facets_in_python(collection))
+    facets = next(collection.aggregate(SUMMARY_PIPELINE, allowDiskUse=True), {})
+    return _shape(facets)
+
+
+def refresh_summary():
+    """
+    Recompute the summary and materialize it into asset_summary. A write
+    that marks it stale while the aggregation runs keeps it stale.
+    """
+    started = utc_now()
+    data = compute_summary()
+    fields = {"computed_at": utc_now(), "data": data}
+    result = asset_summary_collection.update_one(
+        {"_id": SUMMARY_ID, "stale_at": {"$not": {"$gte": started}}}, {"$set": {**fields, "stale": False}},
+    )
+    stale = not result.matched_count
+    if stale:
+        asset_summary_collection.update_one({"_id": SUMMARY_ID}, {"$set": fields}, upsert=True)
+        stale = bool(asset_summary_collection.find_one({"_id": SUMMARY_ID, "stale": True}, {"_id": 1}))
+    return {**fields, "stale": stale}
+
+
+def mark_summary_stale():
+    """Called after asset writes; the next read past the grace period recomputes."""
+    asset_summary_collection.update_one({"_id": SUMMARY_ID}, {"$set": {"stale": True, "stale_at": utc_now()}})
+
+
+def _computed_at(doc):
+    # pymongo hands dates back naive (but in UTC)
+    computed_at = doc["computed_at"]
+    return computed_at.replace(tzinfo=timezone.utc) if computed_at.tzinfo is None else computed_at
+
+
+def _needs_refresh(doc):
+    if not doc:
+        return True
+    age = utc_now() - _computed_at(doc)
+    if age > timedelta(seconds=Config.SUMMARY_TTL):
+        return True
+    # Bursts of writes share one recompute instead of one per view
+    return doc.get("stale") and age > timedelta(seconds=Config.SUMMARY_STALE_GRACE)
+
+
+def get_summary():
+    """
+    The materialized summary, recomputed when missing, older than SUMMARY_TTL,
+    or marked stale by a write more than SUMMARY_STALE_GRACE seconds after it
+    was computed. Returns {"computed_at", "stale", "data"}.
+    """
+    doc = asset_summary_collection.find_one({"_id": SUMMARY_ID})
+    if _needs_refresh(doc):
+        with _refresh_lock:
+            # Another thread may have refreshed it while we waited
+            doc = asset_summary_collection.find_one({"_id": SUMMARY_ID})
+            if _needs_refresh(doc):
+                doc = refresh_summary()
+    doc["computed_at"] = _computed_at(doc)
+    return doc
@@ -0,0 +1,134 @@
+#type_cache.py
+import threading
+import time
+
+from config import Config
+from models import asset_types_collection
+from utils import get_indian_states
+
+STATUS_OPTIONS = ["Available", "Assigned", "Repair/Faulty", "Discard"]
+# The forms post these and normalize_asset_data lowercases them on the way in
+STORED_STATUSES = [s.lower() for s in STATUS_OPTIONS]
+
+
+def field_list_error(fields):
+    """Why a create_type field list can't be stored, or None."""
+    if not isinstance(fields, list) or not fields:
+        return "Type name and fields are required."
+    for field in fields:
+        if not isinstance(field, dict) or not all(str(field.get(k) or "").strip() for k in ("name", "label")):
+            return "Every field needs a name and a label."
+    return None
+
+
+def build_type_entry(doc):
+    """Field list with select options filled in, plus the derived lookups callers need."""
+    fields = []
+    for field in doc.get("fields", []):
+        # Types stored before create_type validated its fields may hold unnamed ones
+        if not isinstance(field, dict) or not field.get("name"):
+            continue
+        field = dict(field)
+        name = field.get("name", "").lower()
+        if field.get("type") == "select" and not field.get("options"):
+            if name == "state":
+                field["options"] = get_indian_states()
+            elif name == "status":
+                field["options"] = STATUS_OPTIONS
+        fields.append(field)
+
+    return {
+        "type_name": doc["type_name"],
+        "fields": fields,
+        "field_names": [f["name"] for f in fields],
+        "allowed_fields": frozenset(f["name"] for f in fields),
+        # Months from purchase_date; None when the type doesn't track warranty
+        "warranty_months": doc.get("warranty_months"),
+    }
+
+
+class TypeSchemaCache:
+    """
+    Per-process cache of asset type definitions.
+    Entries expire after `ttl` seconds; writers call invalidate() so the
+    writing process sees its own changes immediately.
+    """
+
+    def __init__(self, collection, ttl):
+        self.collection = collection
+        self.ttl = ttl
+        self._entries = {}
+        self._names = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, type_name):
+        """Cached entry or None, without touching the database."""
+        with self._lock:
+            cached = self._entries.get(type_name)
+            if cached and cached[0] > time.monotonic():
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            return None
+
+    def store(self, doc):
+        entry = build_type_entry(doc)
+        with self._lock:
+            self._entries[doc["type_name"]] = (time.monotonic() + self.ttl, entry)
+        return entry
+
+    def get(self, type_name):
+        """Entry for `type_name`, loading it on a miss. Unknown types return None (not cached)."""
+        if not type_name:
+            return None
+        entry = self.lookup(type_name)
+        if entry is not None:
+            return entry
+        doc = self.collection.find_one({"type_name": type_name})
+        return self.store(doc) if doc else None
+
+    def lookup_names(self):
+        """Cached sorted type names or None, without touching the database."""
+        with self._lock:
+            if self._names and self._names[0] > time.monotonic():
+                self.hits += 1
+                return self._names[1]
+            self.misses += 1
+            return None
+
+    def store_names(self, names):
+        names = sorted(names)
+        with self._lock:
+            self._names = (time.monotonic() + self.ttl, names)
+        return names
+
+    def type_names(self):
+        names = self.lookup_names()
+        if names is not None:
+            return names
+        return self.store_names(doc["type_name"] for doc in self.collection.find({}, {"_id": 0, "type_name": 1}))
+
+    def invalidate(self, type_name=None):
+        with self._lock:
+            if type_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(type_name, None)
+            self._names = None
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+type_cache = TypeSchemaCache(asset_types_collection, Config.TYPE_CACHE_TTL)
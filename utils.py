@@ -1,5 +1,9 @@
+from datetime import datetime, timezone
 from models import asset_types_collection
 
+DATE_FIELDS = ["given_date", "purchase_date", "collected_date", "prev_given_date", "warranty_expiry"]
+MONEY_FIELDS = ["amount", "gst_18", "gst_22", "gst_28", "total"]
+
 def normalize_asset_data(data):
     return {
         'name': data.get('name', '').strip().title(),
@@ -34,6 +38,7 @@ def get_master_fields():
         {"label": "Previous Given Date", "name": "prev_given_date", "type": "date"},
         {"label": "Given Date", "name": "given_date", "type": "date"},
         {"label": "Collected Date", "name": "collected_date", "type": "date"},
+        {"label": "Warranty Expires On", "name": "warranty_expiry", "type": "date"},
         {"label": "Year", "name": "year", "type": "text"},
         {"label": "Status", "name": "status", "type": "select", "options": get_asset_statuses()},
         {"label": "Remarks", "name": "remarks", "type": "text"},
@@ -81,3 +86,127 @@ def fill_missing_asset_fields(data):
     enriched.setdefault('remarks', '')
     enriched.setdefault('status', 'available')
     return enriched
+
+def utc_now():
+    """Timestamp for updated_at stamps (incremental backups key off it)."""
+    return datetime.now(timezone.utc)
+
+def parse_ddmmyyyy_to_date(val):
+    try:
+        return datetime.strptime(val.strip(), "%d-%m-%Y") if val else None
+    except Exception:
+        return None
+
+def clean_money(value):
+    return value.replace("₹", "").replace(",", "") if value else value
+
+def parse_iso_date(val):
+    """yyyy-mm-dd[Thh:mm:ss[+tz]] as the API returns it -> naive UTC datetime."""
+    try:
+        parsed = datetime.fromisoformat(val.strip())
+    except (TypeError, ValueError):
+        return None
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def to_stored_date(value):
+    """Form/sheet/API text -> datetime (BSON date); blank -> None; unparseable text kept as typed."""
+    if isinstance(value, datetime) or value is None:
+        return value
+    value = str(value).strip()
+    return (parse_ddmmyyyy_to_date(value) or parse_iso_date(value) or value) if value else None
+
+def to_stored_money(value):
+    """'₹1,234.50' -> 1234.5; blank -> None; unparseable text kept as typed."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if value is None:
+        return None
+    value = clean_money(str(value)).strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+# === Compatibility read layer ===============================================
+# Documents written before migrate_types.py still hold "dd-mm-yyyy" / "1234.50"
+# strings, so readers accept both shapes.
+def display_date(value):
+    if isinstance(value, datetime):
+        return value.strftime("%d-%m-%Y")
+    return value or ""
+
+def display_money(value):
+    amount = to_stored_money(value)
+    return f"₹{amount:,.2f}" if isinstance(amount, float) else (amount or "")
+
+def form_values(asset):
+    """Asset -> the plain strings the create/edit form fields expect."""
+    values = {}
+    for key, value in asset.items():
+        if key in DATE_FIELDS:
+            value = display_date(value)
+        elif key in MONEY_FIELDS:
+            value = to_stored_money(value)
+            value = f"{value:.2f}" if isinstance(value, float) else (value or "")
+        elif value is None:
+            value = ""
+        elif not isinstance(value, (str, list)):
+            value = str(value)
+        values[key] = value
+    return values
+
+def _stored_value(key, value):
+    if key in DATE_FIELDS:
+        return to_stored_date(value)
+    if key in MONEY_FIELDS:
+        return to_stored_money(value)
+    return value
+
+def build_asset_payload(raw_data, field_names, category):
+    """
+    Shared by the create/edit forms and bulk import: stores dates as BSON
+    dates and money as numbers, keeps only the type's fields (all present,
+    empty/None if missing).
+    """
+    raw_data = dict(raw_data)
+    raw_data.update(normalize_asset_data(raw_data))
+
+    allowed_fields = set(field_names)
+    payload = {}
+    for k, v in raw_data.items():
+        if k not in allowed_fields:
+            continue
+        if k in DATE_FIELDS or k in MONEY_FIELDS:
+            payload[k] = _stored_value(k, v)
+        else:
+            payload[k] = v if isinstance(v, str) else v.strftime("%d-%m-%Y") if isinstance(v, datetime) else ""
+
+    # Ensure all allowed fields are present, even if empty
+    for field_name in field_names:
+        payload.setdefault(field_name, None if field_name in DATE_FIELDS or field_name in MONEY_FIELDS else "")
+
+    payload["category"] = category
+    return payload
+
+def build_partial_payload(raw_data, allowed_fields):
+    """
+    Partial counterpart of build_asset_payload for $set updates: normalizes
+    only the fields given, the same way the forms do.
+    Returns (payload, unknown field names).
+    """
+    payload = {}
+    unknown = []
+    for key, value in raw_data.items():
+        if key not in allowed_fields:
+            unknown.append(key)
+            continue
+        if key in DATE_FIELDS or key in MONEY_FIELDS:
+            payload[key] = _stored_value(key, value)
+            continue
+        value = "" if value is None else value if isinstance(value, str) else str(value)
+        if key == "status":
+            value = value.strip().lower()
+        payload[key] = value
+    return payload, unknown
@@ -0,0 +1,113 @@
+#warranty.py
+import calendar
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from config import Config
+from utils import utc_now
+
+# Longest warranty a type can declare (50 years)
+MAX_WARRANTY_MONTHS = 600
+
+# What apply_warranty reads from the stored asset on updates
+WARRANTY_FIELDS = ("purchase_date", "warranty_expiry", "warranty_auto")
+
+
+def add_months(d, months):
+    """Same day `months` later, clamped to the month's last day (31-01 + 1 -> 28/29-02)."""
+    month_index = d.month - 1 + months
+    year, month = d.year + month_index // 12, month_index % 12 + 1
+    return d.replace(year=year, month=month, day=min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def parse_warranty_months(value):
+    """Request value -> int months or None (no warranty tracking); raises ValueError."""
+    if value in (None, "", 0, "0"):
+        return None
+    try:
+        months = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("warranty_months must be a whole number of months.")
+    if not 0 < months <= MAX_WARRANTY_MONTHS:
+        raise ValueError(f"warranty_months must be between 1 and {MAX_WARRANTY_MONTHS}.")
+    return months
+
+
+def _has_own_field(entry):
+    # Types that list warranty_expiry let it be typed per asset; the type's months only fill blanks
+    return "warranty_expiry" in entry["allowed_fields"]
+
+
+def _typed_expiry(payload, current):
+    """The warranty_expiry the user typed for this asset, or None when the type's months should fill it."""
+    if "warranty_expiry" in payload:
+        typed = payload["warranty_expiry"]
+        # The edit form posts back the value filled in earlier; that isn't the user typing one
+        if current.get("warranty_auto") and typed == current.get("warranty_expiry"):
+            return None
+        return typed
+    return None if current.get("warranty_auto") else current.get("warranty_expiry")
+
+
+def apply_warranty(payload, entry, current=None):
+    """
+    Set payload["warranty_expiry"] to purchase_date + the type's warranty_months
+    whenever the write touches purchase_date or warranty_expiry, flagging it
+    warranty_auto so later changes recompute it. A value typed for the asset
+    is kept. `current` is the stored asset when updating. Returns the payload.
+    """
+    if not entry or not ("purchase_date" in payload or "warranty_expiry" in payload):
+        return payload
+    current = current or {}
+    if _has_own_field(entry) and _typed_expiry(payload, current) is not None:
+        payload["warranty_auto"] = False
+        return payload
+    months = entry.get("warranty_months")
+    if months:
+        purchased = payload.get("purchase_date", current.get("purchase_date"))
+        payload["warranty_expiry"] = add_months(purchased, months) if isinstance(purchased, datetime) else None
+        payload["warranty_auto"] = True
+    return payload
+
+
+def refresh_type_warranty(entry, collection, apply=True, batch_size=None):
+    """
+    Recompute warranty_expiry for every asset of one type after its
+    warranty_months changed (or on first backfill), leaving values typed per
+    asset alone. Returns the number of assets that needed a new value.
+    """
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    months = entry.get("warranty_months")
+    query = {"category": entry["type_name"]}
+    if _has_own_field(entry):
+        query["$or"] = [{"warranty_expiry": None}, {"warranty_auto": True}]
+
+    changed = 0
+    ops = []
+    now = utc_now()
+    projection = {"purchase_date": 1, "warranty_expiry": 1, "warranty_auto": 1}
+    for doc in collection.find(query, projection).batch_size(batch_size):
+        purchased = doc.get("purchase_date")
+        expiry = add_months(purchased, months) if months and isinstance(purchased, datetime) else None
+        if expiry == doc.get("warranty_expiry") and bool(doc.get("warranty_auto")) == bool(months):
+            continue
+        changed += 1
+        update = {"warranty_expiry": expiry, "warranty_auto": bool(months), "updated_at": now}
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(ops) >= batch_size:
+            if apply:
+                collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops and apply:
+        collection.bulk_write(ops, ordered=False)
+    return changed
+
+
+def expiring_query(days, start=None, category=None):
+    """Assets whose warranty ends in [start, start + days); a range scan on the warranty_expiry index."""
+    start = start or datetime.combine(utc_now().date(), datetime.min.time())
+    query = {"warranty_expiry": {"$gte": start, "$lt": start + timedelta(days=days)}}
+    if category:
+        query["category"] = category
+    return query